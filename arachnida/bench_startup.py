@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = pathlib.Path(__file__).resolve().parent
+TOOLS = {
+    "spider": ROOT / "spider" / "spider.py",
+    "scorpion": ROOT / "scorpion" / "scorpion.py",
+}
+# Heavy modules that must only be imported by the code paths that need them
+LAZY_MODULES = [
+    "requests", "bs4", "lxml", "aiohttp", "asyncio", "tqdm", "PIL", "humanize",
+    "multiprocessing",
+]
+
+
+class Color:
+    INFO = "\033[96m"
+    SUCCESS = "\033[92m"
+    ERROR = "\033[91m"
+    RESET = "\033[0m"
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Startup time of the arachnida CLIs")
+    parser.add_argument(
+        "--tools", nargs="+", default=list(TOOLS), choices=list(TOOLS), help="Tools to time"
+    )
+    parser.add_argument("--runs", default=10, type=int, help="Runs of --help per tool (default 10)")
+    parser.add_argument("--top", default=8, type=int, help="Slowest imports to list (default 8)")
+    parser.add_argument(
+        "--max-ms", type=float, help="Fail if the median --help time exceeds this budget"
+    )
+    return parser.parse_args()
+
+
+def import_times(script: pathlib.Path) -> Tuple[int, List[Tuple[int, str]]]:
+    """Import the tool under -X importtime, returning total and per-module self times (us)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {script.stem}"],
+        cwd=script.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(own), name.strip()))
+        if name.strip() == script.stem:
+            total = int(cumulative)
+    return total, sorted(modules, reverse=True)
+
+
+def help_times(script: pathlib.Path, runs: int) -> List[float]:
+    """Wall time of full `tool --help` runs, interpreter startup included."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(script), "--help"],
+            cwd=script.parent,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def eager_imports(script: pathlib.Path) -> List[str]:
+    """Heavy modules loaded just by importing the tool."""
+    check = (
+        f"import sys, {script.stem}; "
+        f"print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check], cwd=script.parent, capture_output=True, text=True, check=True
+    )
+    return result.stdout.split()
+
+
+def main() -> None:
+    args = parse_arguments()
+    failed = False
+    results: Dict[str, float] = {}
+    for name in args.tools:
+        script = TOOLS[name]
+        total, modules = import_times(script)
+        median = statistics.median(help_times(script, args.runs)) * 1000
+        results[name] = median
+        print(f"{Color.INFO}{name}{Color.RESET}: import {total / 1000:.1f} ms, --help {median:.1f} ms")
+        for own, module in modules[: args.top]:
+            print(f"  {own / 1000:8.1f} ms  {module}")
+        eager = eager_imports(script)
+        if eager:
+            failed = True
+            print(f"{Color.ERROR}  imported at startup: {', '.join(eager)}{Color.RESET}")
+        if args.max_ms is not None and median > args.max_ms:
+            failed = True
+            print(f"{Color.ERROR}  over the {args.max_ms:.0f} ms budget{Color.RESET}")
+    if failed:
+        sys.exit(1)
+    print(f"{Color.SUCCESS}Startup OK{Color.RESET}")
+
+
+if __name__ == "__main__":
+    main()
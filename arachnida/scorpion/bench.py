@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import pathlib
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from PIL import Image
+
+from scorpion import Color, expand_inputs, read_header_metadata, read_pil_metadata
+
+FORMATS = {"jpeg": ".jpg", "png": ".png", "tiff": ".tif"}
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Scorpion benchmarks")
+    parser.add_argument(
+        "images",
+        type=pathlib.Path,
+        nargs="*",
+        help="Images, directories or globs to read (default synthetic)",
+    )
+    parser.add_argument("--files", default=50, type=int, help="Synthetic files per format (default 50)")
+    parser.add_argument("--width", default=6000, type=int, help="Synthetic width (default 6000)")
+    parser.add_argument("--height", default=4000, type=int, help="Synthetic height (default 4000)")
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        default=list(FORMATS),
+        choices=list(FORMATS),
+        help="Synthetic formats (default all)",
+    )
+    parser.add_argument("--repeat", default=3, type=int, help="Passes over the files (default 3)")
+    return parser.parse_args()
+
+
+def make_images(directory: pathlib.Path, args: argparse.Namespace) -> Dict[str, List[pathlib.Path]]:
+    """Write one large camera-like image per format and copy it --files times."""
+    exif = Image.Exif()
+    exif[0x010F] = "Canon"
+    exif[0x0110] = "Canon EOS 5D"
+    exif[0x0131] = "bench"
+    exif[0x0132] = "2024:01:01 12:00:00"
+    exif[0x011A] = 300.0
+    noise = Image.effect_noise((args.width, args.height), 64).convert("RGB")
+
+    images = {}
+    for name in args.formats:
+        original = directory / f"original{FORMATS[name]}"
+        noise.save(original, exif=exif)
+        copies = [directory / f"{name}-{i}{FORMATS[name]}" for i in range(args.files)]
+        for copy in copies:
+            shutil.copyfile(original, copy)
+        images[name] = copies
+        print(f"{name:6} {args.files} x {os.path.getsize(original) / 2**20:.1f} MB")
+    return images
+
+
+def files_per_second(reader: Callable, paths: List[pathlib.Path], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in paths:
+            reader(path)
+    return len(paths) * repeat / (time.perf_counter() - start)
+
+
+def bench_readers(images: Dict[str, List[pathlib.Path]], repeat: int) -> None:
+    """Report files/sec for the header parser and PIL, and check they agree."""
+    print(f"{'set':12} {'header/s':>10} {'PIL/s':>10} {'speedup':>8} {'fallbacks':>10}")
+    for name, paths in images.items():
+        fallbacks = 0
+        for path in paths:
+            fast = read_header_metadata(path)
+            if fast is None:
+                fallbacks += 1
+                continue
+            slow = read_pil_metadata(path)
+            if any(fast[key] != slow[key] for key in ("Format", "Mode", "Image Width", "Image Height")):
+                print(f"{Color.WARNING}{path}: header parser disagrees with PIL{Color.RESET}")
+
+        def header(path: pathlib.Path) -> dict:
+            return read_header_metadata(path) or read_pil_metadata(path)
+
+        fast = files_per_second(header, paths, repeat)
+        slow = files_per_second(read_pil_metadata, paths, repeat)
+        print(f"{name:12} {fast:10.1f} {slow:10.1f} {fast / slow:7.1f}x {fallbacks:10}")
+
+
+def main() -> None:
+    args = parse_arguments()
+    if args.images:
+        bench_readers({"input": expand_inputs(args.images)}, args.repeat)
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        images = make_images(pathlib.Path(directory), args)
+        bench_readers(images, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
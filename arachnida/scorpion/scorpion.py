@@ -1,12 +1,28 @@
 import argparse
+import csv
+import datetime
+import functools
+import glob
+import io
+import json
+import math
+import numbers
+import os
 import pathlib
-from PIL import Image, ExifTags
-import humanize
+import struct
+import sys
+import tempfile
+import zlib
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 import time
 import stat
-from tqdm import tqdm
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, TextIO, Tuple
 import logging
 
+# PIL, humanize, tqdm, sqlite3 and multiprocessing are imported where they are
+# used: wrappers run scorpion once per file, so startup time matters.
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
@@ -24,6 +40,44 @@ HEADER = """
                                                                            
 """
 SEPARATOR = "-" * 80
+# Files picked up when walking a directory
+IMAGE_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tif", ".tiff", ".webp",
+}
+IN_FLIGHT_PER_JOB = 4  # Files queued per worker process in batch mode
+MAX_IFD_ENTRIES = 1024  # More than this in one IFD means the file is corrupt
+MAX_TAG_SIZE = 1024 * 1024  # Larger tag values (strip tables...) are skipped
+MAX_TEXT_SIZE = 1024 * 1024  # Cap on PNG text chunks, also after inflating
+# TIFF field type -> (struct format of one value, size in bytes)
+TIFF_TYPES = {
+    1: ("B", 1), 2: ("s", 1), 3: ("H", 2), 4: ("L", 4), 5: ("LL", 8), 6: ("b", 1),
+    7: ("s", 1), 8: ("h", 2), 9: ("l", 4), 10: ("ll", 8), 11: ("f", 4), 12: ("d", 8),
+}
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+JPEG_MODES = {1: "L", 3: "RGB", 4: "CMYK"}
+CHUNK_SIZE = 64 * 1024  # Bytes copied at a time when stripping
+# Columns of the machine-readable output, dicts are written as JSON
+RECORD_FIELDS = [
+    "path", "filename", "size", "created", "modified", "mtime_ns", "inode", "permissions",
+    "format", "mode", "width", "height", "latitude", "longitude", "altitude", "exif", "gps",
+    "text",
+]
+JSON_FIELDS = ("exif", "gps", "text")
+SQLITE_COMMIT_EVERY = 500  # Records per transaction in the SQLite sink
+PNG_METADATA_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"eXIf", b"tIME"}
+# PIL info keys and TIFF tags that count as metadata for the PIL strip path
+PIL_METADATA_KEYS = {"exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop", "iptc"}
+TIFF_METADATA_TAGS = {
+    0x10E, 0x10F, 0x110, 0x131, 0x132, 0x13B, 0x2BC, 0x83BB, 0x8298, 0x8769, 0x8825,
+}
+GPS_IFD = 0x8825  # IFD0 tag pointing at the GPS IFD
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# (bit depth, color type) -> PIL mode, as PIL's PNG plugin reports it
+PNG_MODES = {
+    (1, 0): "1", (2, 0): "L", (4, 0): "L", (8, 0): "L", (16, 0): "I;16",
+    (8, 2): "RGB", (16, 2): "RGB", (1, 3): "P", (2, 3): "P", (4, 3): "P",
+    (8, 3): "P", (8, 4): "LA", (16, 4): "RGBA", (8, 6): "RGBA", (16, 6): "RGBA",
+}
 
 
 class Color:
@@ -42,38 +96,406 @@ def print_header() -> None:
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Image metadata viewer and editor")
-    parser.add_argument("image", type=pathlib.Path, nargs="+", help="Images to process")
+    parser.add_argument(
+        "image",
+        type=pathlib.Path,
+        nargs="*",
+        help="Images, directories (searched recursively) or glob patterns to process",
+    )
     parser.add_argument(
         "-d", "--delete", action="store_true", help="Delete all EXIF metadata"
     )
+    parser.add_argument(
+        "-i",
+        "--in-place",
+        action="store_true",
+        help="With -d, replace the images instead of writing .stripped copies",
+    )
+    parser.add_argument(
+        "--preserve",
+        action="store_true",
+        help="With --in-place, keep the original access and modification times",
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Enable verbose mode"
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes, 0 for one per CPU (default 1)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["text", "jsonl", "csv", "sqlite"],
+        default="text",
+        help="Output format (default text)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=pathlib.Path,
+        help="Write records to this file instead of stdout (default scorpion.db for sqlite)",
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="Print results as soon as they are ready instead of in input order",
+    )
+    parser.add_argument(
+        "--index",
+        type=pathlib.Path,
+        help="SQLite index: unchanged files are served from it, new ones added",
+    )
+    parser.add_argument(
+        "--query",
+        action="store_true",
+        help="List images from --index matching --has-gps/--camera instead of scanning",
+    )
+    parser.add_argument(
+        "--has-gps", action="store_true", help="With --query, only images with a position"
+    )
+    parser.add_argument(
+        "--camera", help="With --query, only images whose camera make or model contains this"
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        "--no-banner",
+        action="store_true",
+        help="Don't print the banner or progress bars",
+    )
+    args = parser.parse_args()
+    if args.query and not args.index:
+        parser.error("--query needs --index")
+    if not args.query and not args.image:
+        parser.error("the following arguments are required: image")
+    return args
+
+
+def expand_inputs(paths: Iterable[pathlib.Path]) -> List[pathlib.Path]:
+    """Expand directories and glob patterns into the image files they contain."""
+    images = []
+    for path in paths:
+        if path.is_dir():
+            images.extend(
+                sorted(
+                    found
+                    for found in path.rglob("*")
+                    if found.suffix.lower() in IMAGE_EXTENSIONS and found.is_file()
+                )
+            )
+        elif not path.exists() and glob.has_magic(str(path)):
+            images.extend(
+                sorted(
+                    pathlib.Path(found)
+                    for found in glob.iglob(str(path), recursive=True)
+                    if os.path.isfile(found)
+                )
+            )
+        else:
+            images.append(path)
+    return images
+
+
+def run_alone(worker: Callable, item) -> Tuple[object, object, Optional[BaseException]]:
+    """Run worker on one item in its own process, so a crash only hits that item."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return item, pool.submit(worker, item).result(), None
+        except Exception as e:
+            return item, None, e
+
+
+def run_batch(
+    worker: Callable, items: Iterable, jobs: int, ordered: bool
+) -> Iterator[Tuple[object, object, Optional[BaseException]]]:
+    """Run worker over items in a process pool, yielding (item, result, error).
+
+    Only a few items per process are queued at a time, so huge batches do
+    not pile up in memory. A failing item is reported and the batch carries
+    on. If a worker process dies, the items the pool was holding are rerun
+    one by one to find the culprit before a fresh pool takes over.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    items = iter(items)
+    in_flight: deque = deque()
+    pool = ProcessPoolExecutor(max_workers=jobs)
+
+    def refill() -> None:
+        for item in items:
+            try:
+                future = pool.submit(worker, item)
+            except BrokenProcessPool as e:
+                future = Future()
+                future.set_exception(e)
+            in_flight.append((item, future))
+            if len(in_flight) >= jobs * IN_FLIGHT_PER_JOB:
+                return
+
+    try:
+        refill()
+        while in_flight:
+            if ordered:
+                item, future = in_flight.popleft()
+                wait([future])
+            else:
+                done, _ = wait([future for _, future in in_flight], return_when=FIRST_COMPLETED)
+                item, future = next(entry for entry in in_flight if entry[1] in done)
+                in_flight.remove((item, future))
+
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                suspects = [item] + [entry for entry, _ in in_flight]
+                in_flight.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                for suspect in suspects:
+                    yield run_alone(worker, suspect)
+                pool = ProcessPoolExecutor(max_workers=jobs)
+            else:
+                yield item, None if error else future.result(), error
+            refill()
+    finally:
+        pool.shutdown(cancel_futures=True)
 
 
 def build_stripped_file_name(image_path: pathlib.Path) -> pathlib.Path:
     return image_path.with_name(image_path.stem + ".stripped" + image_path.suffix)
 
 
-def strip_image_metadata(image_path: pathlib.Path, verbose: bool) -> None:
+def copy_bytes(source: BinaryIO, dest: BinaryIO, size: int) -> None:
+    while size:
+        chunk = read_exact(source, min(size, CHUNK_SIZE))
+        dest.write(chunk)
+        size -= len(chunk)
+
+
+def keep_jpeg_segment(marker: int, body: bytes) -> bool:
+    """Keep JFIF, ICC profiles and Adobe colour info, drop Exif/XMP/IPTC/comments."""
+    if marker == 0xFE or 0xE0 <= marker <= 0xEF:
+        return marker in (0xE0, 0xEE) or (marker == 0xE2 and body.startswith(b"ICC_PROFILE\0"))
+    return True
+
+
+def copy_jpeg_scan(source: BinaryIO, dest: BinaryIO) -> None:
+    """Copy entropy-coded data up to the next marker, leaving source on it."""
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if len(chunk) < 2:
+            raise EOFError("Truncated scan data")
+        index = chunk.find(b"\xff")
+        while index != -1 and index + 1 < len(chunk):
+            following = chunk[index + 1]
+            if following != 0 and following != 0xFF and not 0xD0 <= following <= 0xD7:
+                dest.write(chunk[:index])
+                source.seek(index - len(chunk), os.SEEK_CUR)
+                return
+            index = chunk.find(b"\xff", index + 1)
+        if index == -1:
+            dest.write(chunk)
+        else:  # 0xFF at the end of the chunk, look at it again with the next one
+            dest.write(chunk[:-1])
+            source.seek(-1, os.SEEK_CUR)
+
+
+def strip_jpeg(source: BinaryIO, dest: BinaryIO) -> int:
+    dest.write(read_exact(source, 2))
+    dropped = 0
+    while True:
+        prefix, marker = read_exact(source, 2)
+        if prefix != 0xFF:
+            raise ValueError("Bad JPEG marker")
+        while marker == 0xFF:
+            marker = read_exact(source, 1)[0]
+        if marker == 0xD9:
+            dest.write(b"\xff\xd9")
+            return dropped  # Anything after EOI (MPO frames...) is dropped too
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            dest.write(bytes((0xFF, marker)))
+            continue
+        header = read_exact(source, 2)
+        (length,) = struct.unpack(">H", header)
+        body = read_exact(source, length - 2)
+        if not keep_jpeg_segment(marker, body):
+            dropped += 1
+            continue
+        dest.write(bytes((0xFF, marker)) + header + body)
+        if marker == 0xDA:
+            copy_jpeg_scan(source, dest)
+
+
+def strip_png(source: BinaryIO, dest: BinaryIO) -> int:
+    dest.write(read_exact(source, len(PNG_SIGNATURE)))
+    dropped = 0
+    while True:
+        header = read_exact(source, 8)
+        length, kind = struct.unpack(">L4s", header)
+        if kind in PNG_METADATA_CHUNKS:
+            source.seek(length + 4, os.SEEK_CUR)
+            dropped += 1
+            continue
+        dest.write(header)
+        copy_bytes(source, dest, length + 4)  # Data and CRC, unchanged
+        if kind == b"IEND":
+            return dropped
+
+
+def strip_stream(source: BinaryIO, dest: BinaryIO) -> Optional[int]:
+    """Copy a JPEG or PNG without its metadata, leaving image data byte-for-byte intact.
+
+    Returns the number of metadata segments dropped, or None if the format
+    is not handled here.
+    """
+    magic = source.read(8)
+    source.seek(0)
+    if magic.startswith(b"\xff\xd8"):
+        return strip_jpeg(source, dest)
+    if magic == PNG_SIGNATURE:
+        return strip_png(source, dest)
+    return None
+
+
+def has_metadata(image_path: pathlib.Path) -> Optional[bool]:
+    """Look for strippable segments without copying anything, None if unsure."""
+    with open(image_path, "rb") as source:
+        magic = source.read(8)
+        if magic.startswith(b"\xff\xd8"):
+            source.seek(2)
+            while True:
+                prefix, marker = read_exact(source, 2)
+                if prefix != 0xFF:
+                    raise ValueError("Bad JPEG marker")
+                while marker == 0xFF:
+                    marker = read_exact(source, 1)[0]
+                if marker in (0xD9, 0xDA):
+                    return False
+                if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+                    continue
+                (length,) = struct.unpack(">H", read_exact(source, 2))
+                body = read_exact(source, min(length - 2, 12))
+                if not keep_jpeg_segment(marker, body):
+                    return True
+                source.seek(length - 2 - len(body), os.SEEK_CUR)
+        if magic == PNG_SIGNATURE:
+            while True:
+                length, kind = struct.unpack(">L4s", read_exact(source, 8))
+                if kind in PNG_METADATA_CHUNKS:
+                    return True
+                if kind == b"IEND":
+                    return False
+                source.seek(length + 4, os.SEEK_CUR)
+    return None
+
+
+def strip_with_pil(image_path: pathlib.Path, save_path: pathlib.Path, force: bool) -> bool:
+    """Re-encode formats the streaming path does not handle, copying pixels in C.
+
+    Unless forced, returns False without writing when there is no metadata.
+    """
+    from PIL import Image, ImageSequence
+
+    with Image.open(image_path) as source:
+        tags = set(getattr(source, "tag_v2", {}))
+        if not (force or PIL_METADATA_KEYS & source.info.keys() or TIFF_METADATA_TAGS & tags):
+            return False
+        image_format = source.format
+        frame_count = getattr(source, "n_frames", 1)
+        frames = [frame.copy() for frame in ImageSequence.Iterator(source)]
+        # PIL's WebP default is lossy; the stripped copy must keep the same pixels
+        options = {"lossless": True} if image_format == "WEBP" else {}
+        if frame_count > 1:
+            # Animations and multi-page files keep every frame and their timing
+            options["save_all"] = True
+            options["append_images"] = frames[1:]
+            durations = [frame.info.get("duration") for frame in frames]
+            if all(duration is not None for duration in durations):
+                options["duration"] = durations
+            if "loop" in source.info:
+                options["loop"] = source.info["loop"]
+    stripped = frames[0]
+    stripped.info = {
+        key: value
+        for key, value in stripped.info.items()
+        if key in ("transparency", "icc_profile")
+    }
+    stripped.save(save_path, format=image_format, **options)
+    with Image.open(save_path) as written:
+        if getattr(written, "n_frames", 1) != frame_count:
+            raise ValueError(f"{image_path}: stripped copy lost frames, original kept")
+    return True
+
+
+def write_stripped(image_path: pathlib.Path, save_path: pathlib.Path, force: bool = False) -> bool:
+    """Write image_path without metadata to save_path, False if there was none."""
+    with open(image_path, "rb") as source, open(save_path, "wb") as dest:
+        dropped = strip_stream(source, dest)
+        if dropped is not None:
+            dest.flush()
+            os.fsync(dest.fileno())
+            return dropped > 0
+    return strip_with_pil(image_path, save_path, force)
+
+
+def replace_stripped(image_path: pathlib.Path, preserve: bool) -> bool:
+    """Strip image_path in place through a temp file and an atomic rename."""
+    if has_metadata(image_path) is False:
+        return False
+    stats = image_path.stat()
+    fd, temp_name = tempfile.mkstemp(
+        prefix=".scorpion-", suffix=image_path.suffix, dir=image_path.parent
+    )
+    os.close(fd)
+    temp_path = pathlib.Path(temp_name)
     try:
-        with Image.open(image_path) as source:
-            stripped = Image.new(source.mode, source.size)
-            stripped.putdata(list(source.getdata()))
-            save_path = build_stripped_file_name(image_path)
-            stripped.save(save_path)
-            if verbose:
-                logging.info(
-                    f"Stripped metadata from {Color.SUCCESS}{image_path} -> {save_path}{Color.RESET}"
-                )
+        if not write_stripped(image_path, temp_path):
+            temp_path.unlink()
+            return False
+        # Like sed -i, never change who can read the file
+        os.chmod(temp_path, stat.S_IMODE(stats.st_mode))
+        if preserve:
+            os.utime(temp_path, ns=(stats.st_atime_ns, stats.st_mtime_ns))
+        os.replace(temp_path, image_path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return True
+
+
+def strip_image_metadata(
+    image_path: pathlib.Path, verbose: bool, in_place: bool = False, preserve: bool = False
+) -> Optional[bool]:
+    """Strip one image; True if it was rewritten, False if it was clean, None on error."""
+    save_path = image_path if in_place else build_stripped_file_name(image_path)
+    try:
+        if in_place:
+            stripped = replace_stripped(image_path, preserve)
+        else:
+            write_stripped(image_path, save_path, force=True)
+            stripped = True
+        if verbose and stripped:
+            logging.info(
+                f"Stripped metadata from {Color.SUCCESS}{image_path} -> {save_path}{Color.RESET}"
+            )
+        elif verbose:
+            logging.info(f"No metadata in {Color.SUCCESS}{image_path}{Color.RESET}")
+        return stripped
     except Exception as e:
+        if not in_place:
+            save_path.unlink(missing_ok=True)
         logging.warning(
             f"{Color.ERROR}Failed to process {image_path}: {e}{Color.RESET}"
         )
+        return None
 
 
 def extract_basic_file_info(image_path: pathlib.Path) -> dict:
+    import humanize
+
     if not image_path.exists():
         raise FileNotFoundError("File does not exist")
     stats = image_path.stat()
@@ -86,25 +508,235 @@ def extract_basic_file_info(image_path: pathlib.Path) -> dict:
     }
 
 
+def read_exact(source: BinaryIO, size: int) -> bytes:
+    data = source.read(size)
+    if len(data) != size:
+        raise EOFError("Truncated file")
+    return data
+
+
+def decode_tiff_value(order: str, kind: int, count: int, raw: bytes):
+    """Decode a TIFF field the way PIL's getexif() presents it."""
+    if kind == 2:
+        return raw.split(b"\0", 1)[0].decode("latin-1", "replace")
+    if kind in (1, 7):
+        return raw
+    fmt, _ = TIFF_TYPES[kind]
+    values = struct.unpack(order + fmt * count, raw)
+    if kind in (5, 10):
+        values = tuple(
+            num / den if den else float("nan") for num, den in zip(values[::2], values[1::2])
+        )
+    return values[0] if count == 1 else values
+
+
+def read_ifd_entries(source: BinaryIO, base: int, order: str, offset: int) -> dict:
+    source.seek(base + offset)
+    (count,) = struct.unpack(order + "H", read_exact(source, 2))
+    if count > MAX_IFD_ENTRIES:
+        raise ValueError("Too many IFD entries")
+    entries = read_exact(source, count * 12)
+
+    tags = {}
+    for index in range(count):
+        tag, kind, values, raw = struct.unpack_from(order + "HHL4s", entries, index * 12)
+        if kind not in TIFF_TYPES:
+            continue
+        size = TIFF_TYPES[kind][1] * values
+        if size > MAX_TAG_SIZE:
+            continue
+        if size > 4:
+            (position,) = struct.unpack(order + "L", raw)
+            source.seek(base + position)
+            raw = read_exact(source, size)
+        tags[tag] = decode_tiff_value(order, kind, values, raw[:size])
+    return tags
+
+
+def read_ifd(source: BinaryIO, base: int) -> Tuple[dict, dict]:
+    """Read the first IFD and the GPS IFD of the TIFF structure that starts at base."""
+    source.seek(base)
+    header = read_exact(source, 8)
+    if header[:4] == b"II*\0":
+        order = "<"
+    elif header[:4] == b"MM\0*":
+        order = ">"
+    else:
+        raise ValueError("Not a TIFF header")
+    (offset,) = struct.unpack(order + "L", header[4:])
+    tags = read_ifd_entries(source, base, order, offset)
+    gps = tags.get(GPS_IFD)
+    return tags, read_ifd_entries(source, base, order, gps) if isinstance(gps, int) else {}
+
+
+def read_jpeg_header(source: BinaryIO) -> dict:
+    """Walk the JPEG markers up to the scan data, reading only SOF and Exif APP1."""
+    metadata = {"Format": "JPEG", "EXIF": {}, "GPS": {}}
+    source.seek(2)
+    while True:
+        prefix, marker = read_exact(source, 2)
+        if prefix != 0xFF:
+            raise ValueError("Bad JPEG marker")
+        while marker == 0xFF:
+            marker = read_exact(source, 1)[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            continue  # Markers without a payload
+        if marker in (0xD9, 0xDA):
+            break  # Image data follows, no metadata past this point
+        (length,) = struct.unpack(">H", read_exact(source, 2))
+        end = source.tell() + length - 2
+        if marker in JPEG_SOF_MARKERS:
+            _, height, width, components = struct.unpack(">BHHB", read_exact(source, 6))
+            metadata.update(
+                {"Mode": JPEG_MODES[components], "Image Width": width, "Image Height": height}
+            )
+        elif marker == 0xE1 and not metadata["EXIF"]:
+            body = read_exact(source, length - 2)
+            if body.startswith(b"Exif\0\0"):
+                metadata["EXIF"], metadata["GPS"] = read_ifd(io.BytesIO(body), 6)
+        elif marker == 0xE2 and length >= 6 and read_exact(source, 4) == b"MPF\0":
+            metadata["Format"] = "MPO"
+        source.seek(end)
+    if "Mode" not in metadata:
+        raise ValueError("No SOF marker")
+    return metadata
+
+
+def inflate_text(data: bytes) -> bytes:
+    inflater = zlib.decompressobj()
+    return inflater.decompress(data, MAX_TEXT_SIZE)
+
+
+def read_png_header(source: BinaryIO) -> dict:
+    """Walk the PNG chunks, reading IHDR, eXIf and text and seeking over the rest."""
+    metadata = {"Format": "PNG", "EXIF": {}, "GPS": {}}
+    text = {}
+    source.seek(len(PNG_SIGNATURE))
+    while True:
+        length, kind = struct.unpack(">L4s", read_exact(source, 8))
+        end = source.tell() + length + 4  # Chunk data plus CRC
+        if kind == b"IHDR":
+            width, height, depth, color = struct.unpack(">LLBB", read_exact(source, 10))
+            metadata.update(
+                {"Mode": PNG_MODES[depth, color], "Image Width": width, "Image Height": height}
+            )
+        elif kind == b"eXIf" and length <= MAX_TAG_SIZE:
+            body = read_exact(source, length)
+            base = 6 if body.startswith(b"Exif\0\0") else 0
+            metadata["EXIF"], metadata["GPS"] = read_ifd(io.BytesIO(body), base)
+        elif kind in (b"tEXt", b"zTXt", b"iTXt") and length <= MAX_TEXT_SIZE:
+            keyword, _, body = read_exact(source, length).partition(b"\0")
+            if kind == b"tEXt":
+                value = body.decode("latin-1", "replace")
+            elif kind == b"zTXt":
+                value = inflate_text(body[1:]).decode("latin-1", "replace")
+            else:
+                compressed, body = body[0], body[2:]
+                _, _, body = body.partition(b"\0")  # Language tag
+                _, _, body = body.partition(b"\0")  # Translated keyword
+                value = (inflate_text(body) if compressed else body).decode("utf-8", "replace")
+            text[keyword.decode("latin-1", "replace")] = value
+        elif kind == b"IEND" or (kind == b"IDAT" and metadata["EXIF"]):
+            break  # eXIf may trail the image data, so only stop early once seen
+        source.seek(end)
+    if "Mode" not in metadata:
+        raise ValueError("No IHDR chunk")
+    if text:
+        metadata["Text"] = text
+    return metadata
+
+
+def tiff_mode(tags: dict) -> Optional[str]:
+    """Map the common TIFF layouts to PIL modes, None for the rest."""
+    photometric = tags.get(0x106)
+    samples = tags.get(0x115, 1)
+    bits = tags.get(0x102, 1)
+    if isinstance(bits, tuple):
+        bits = bits[0] if len(set(bits)) == 1 else None
+    if photometric in (0, 1) and samples == 1 and bits in (1, 8):
+        return "1" if bits == 1 else "L"
+    if photometric == 2 and bits == 8 and samples == 3:
+        return "RGB"
+    if photometric == 2 and bits == 8 and samples == 4:
+        return "RGBA" if tags.get(0x152) in (1, 2) else "RGBX"
+    if photometric == 3 and bits == 8 and samples == 1:
+        return "P"
+    if photometric == 5 and bits == 8 and samples == 4:
+        return "CMYK"
+    return None
+
+
+def read_tiff_header(source: BinaryIO) -> Optional[dict]:
+    tags, gps = read_ifd(source, 0)
+    mode = tiff_mode(tags)
+    if mode is None or 0x100 not in tags or 0x101 not in tags:
+        return None
+    return {
+        "Format": "TIFF",
+        "Mode": mode,
+        "Image Width": tags[0x100],
+        "Image Height": tags[0x101],
+        "EXIF": tags,
+        "GPS": gps,
+    }
+
+
+def read_header(source: BinaryIO) -> Optional[dict]:
+    """Read format, size and EXIF from the headers of an open image, or a prefix of one.
+
+    Returns None for data this parser does not understand, so the caller can
+    fall back to PIL.
+    """
+    try:
+        magic = source.read(8)
+        if magic.startswith(b"\xff\xd8"):
+            return read_jpeg_header(source)
+        if magic == PNG_SIGNATURE:
+            return read_png_header(source)
+        if magic[:4] in (b"II*\0", b"MM\0*"):
+            return read_tiff_header(source)
+    except (ValueError, KeyError, EOFError, struct.error, zlib.error):
+        pass
+    return None
+
+
+def read_header_metadata(image_path: pathlib.Path) -> Optional[dict]:
+    """Read format, size and EXIF from the file headers without decoding pixels."""
+    with open(image_path, "rb") as source:
+        return read_header(source)
+
+
+def read_pil_metadata(image_path: pathlib.Path) -> dict:
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        exif = img.getexif()
+        return {
+            "Format": img.format,
+            "Mode": img.mode,
+            "Image Width": img.width,
+            "Image Height": img.height,
+            "EXIF": dict(exif),
+            "GPS": dict(exif.get_ifd(GPS_IFD)),
+        }
+
+
 def extract_image_metadata(image_path: pathlib.Path, verbose: bool) -> dict:
+    from PIL import ExifTags
+
     metadata = {}
     try:
         metadata = extract_basic_file_info(image_path)
-        with Image.open(image_path) as img:
-            metadata.update(
-                {
-                    "Format": img.format,
-                    "Mode": img.mode,
-                    "Image Width": img.width,
-                    "Image Height": img.height,
-                }
-            )
-            exif_data = img.getexif()
-            metadata["EXIF"] = {
-                ExifTags.TAGS.get(tag, tag): value
-                for tag, value in exif_data.items()
-                if isinstance(value, str) or verbose
-            }
+        image = read_header_metadata(image_path) or read_pil_metadata(image_path)
+        for key in ("Format", "Mode", "Image Width", "Image Height"):
+            metadata[key] = image[key]
+        metadata["EXIF"] = {
+            ExifTags.TAGS.get(tag, tag): value
+            for tag, value in image["EXIF"].items()
+            if isinstance(value, str) or verbose
+        }
+        if "Text" in image:
+            metadata["Text"] = image["Text"]
     except Exception as e:
         logging.warning(
             f"{Color.ERROR}Could not read metadata from {image_path}: {e}{Color.RESET}"
@@ -112,9 +744,224 @@ def extract_image_metadata(image_path: pathlib.Path, verbose: bool) -> dict:
     return metadata
 
 
+def normalize_value(value):
+    """Turn an EXIF value into something JSON, CSV and SQLite can hold."""
+    if isinstance(value, (bool, int)) or value is None:
+        return value
+    if isinstance(value, (numbers.Rational, float)):
+        value = float(value)
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, bytes):
+        text = value.rstrip(b"\0")
+        if text and text.isascii() and text.decode().isprintable():
+            return text.decode()
+        return value.hex()
+    if isinstance(value, (tuple, list)):
+        return [normalize_value(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): normalize_value(item) for key, item in value.items()}
+    return str(value).rstrip("\0")
+
+
+def gps_degrees(value, ref) -> Optional[float]:
+    """Convert an EXIF (degrees, minutes, seconds) triple to signed decimal degrees."""
+    try:
+        degrees, minutes, seconds = (float(part) for part in value)
+    except (TypeError, ValueError):
+        return None
+    if any(math.isnan(part) for part in (degrees, minutes, seconds)):
+        return None
+    decimal = degrees + minutes / 60 + seconds / 3600
+    if isinstance(ref, bytes):
+        ref = ref.decode("latin-1")
+    return -decimal if str(ref).strip("\0").upper() in ("S", "W") else decimal
+
+
+def gps_position(gps: dict) -> dict:
+    altitude = normalize_value(gps.get(6))
+    if isinstance(altitude, float) and gps.get(5) in (1, b"\x01"):
+        altitude = -altitude  # Below sea level
+    return {
+        "latitude": gps_degrees(gps.get(2), gps.get(1)),
+        "longitude": gps_degrees(gps.get(4), gps.get(3)),
+        "altitude": altitude if isinstance(altitude, float) else None,
+    }
+
+
+def extract_record(image_path: pathlib.Path, head: Optional[bytes] = None) -> dict:
+    """Extract everything about one image as a flat, normalized record.
+
+    head may hold the first bytes of the file, already in memory; the file
+    itself is only read if they do not contain all the headers.
+    """
+    from PIL import ExifTags
+
+    stats = image_path.stat()
+    image = (
+        (head and read_header(io.BytesIO(head)))
+        or read_header_metadata(image_path)
+        or read_pil_metadata(image_path)
+    )
+    record = {
+        "path": str(image_path),
+        "filename": image_path.name,
+        "size": stats.st_size,
+        "created": datetime.datetime.fromtimestamp(stats.st_ctime).isoformat(),
+        "modified": datetime.datetime.fromtimestamp(stats.st_mtime).isoformat(),
+        "mtime_ns": stats.st_mtime_ns,
+        "inode": stats.st_ino,
+        "permissions": stat.filemode(stats.st_mode),
+        "format": image["Format"],
+        "mode": image["Mode"],
+        "width": image["Image Width"],
+        "height": image["Image Height"],
+    }
+    record.update(gps_position(image["GPS"]))
+    record["exif"] = {
+        ExifTags.TAGS.get(tag, str(tag)): normalize_value(value)
+        for tag, value in image["EXIF"].items()
+    }
+    record["gps"] = {
+        ExifTags.GPSTAGS.get(tag, str(tag)): normalize_value(value)
+        for tag, value in image["GPS"].items()
+    }
+    record["text"] = image.get("Text", {})
+    return record
+
+
+class JsonlSink:
+    """One JSON object per line."""
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+
+    def write(self, record: dict) -> None:
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        self.stream.flush()
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+class CsvSink(JsonlSink):
+    """Fixed RECORD_FIELDS columns, nested values as JSON."""
+
+    def __init__(self, stream: TextIO) -> None:
+        super().__init__(stream)
+        self.writer = csv.DictWriter(stream, fieldnames=RECORD_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, record: dict) -> None:
+        self.writer.writerow(
+            {
+                key: json.dumps(value, ensure_ascii=False) if isinstance(value, dict) else value
+                for key, value in record.items()
+            }
+        )
+
+
+class SqliteSink:
+    """An images table keyed on path; re-running replaces the old rows."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        import sqlite3
+
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        columns = ", ".join(
+            f"{field} TEXT PRIMARY KEY" if field == "path" else field for field in RECORD_FIELDS
+        )
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS images ({columns})")
+        self.insert = (
+            f"INSERT OR REPLACE INTO images ({', '.join(RECORD_FIELDS)}) "
+            f"VALUES ({', '.join('?' * len(RECORD_FIELDS))})"
+        )
+        self.pending = 0
+
+    def write(self, record: dict) -> None:
+        self.db.execute(
+            self.insert,
+            [
+                json.dumps(record[field], ensure_ascii=False)
+                if field in JSON_FIELDS
+                else record[field]
+                for field in RECORD_FIELDS
+            ],
+        )
+        self.pending += 1
+        if self.pending >= SQLITE_COMMIT_EVERY:
+            self.db.commit()
+            self.pending = 0
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+
+class MetadataIndex(SqliteSink):
+    """A SqliteSink that is also read back: rows stay valid while size, mtime and inode match."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        super().__init__(path)
+        self.db.execute("CREATE INDEX IF NOT EXISTS images_latitude ON images (latitude)")
+
+    @staticmethod
+    def to_record(row: "sqlite3.Row") -> dict:
+        record = dict(row)
+        for field in JSON_FIELDS:
+            record[field] = json.loads(record[field])
+        return record
+
+    def lookup(self, image_path: pathlib.Path) -> Optional[dict]:
+        """Return the stored record if the file has not changed since it was indexed."""
+        try:
+            stats = image_path.stat()
+        except OSError:
+            return None
+        row = self.db.execute(
+            "SELECT * FROM images WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+            (str(image_path), stats.st_size, stats.st_mtime_ns, stats.st_ino),
+        ).fetchone()
+        return self.to_record(row) if row else None
+
+    def prune(self, root: pathlib.Path, seen: set) -> int:
+        """Forget files under root that were not seen by this scan."""
+        prefix = os.path.join(str(root), "")
+        gone = [
+            path
+            for (path,) in self.db.execute(
+                "SELECT path FROM images WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            )
+            if path not in seen
+        ]
+        self.db.executemany("DELETE FROM images WHERE path = ?", [(path,) for path in gone])
+        return len(gone)
+
+    def query(self, has_gps: bool, camera: Optional[str]) -> Iterator[dict]:
+        conditions, params = [], []
+        if has_gps:
+            conditions.append("latitude IS NOT NULL AND longitude IS NOT NULL")
+        if camera:
+            conditions.append(
+                "(json_extract(exif, '$.Make') LIKE ? OR json_extract(exif, '$.Model') LIKE ?)"
+            )
+            params += [f"%{camera}%"] * 2
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        for row in self.db.execute(f"SELECT * FROM images{where} ORDER BY path", params):
+            yield self.to_record(row)
+
+
+def open_sink(output_format: str, output: Optional[pathlib.Path]):
+    if output_format == "sqlite":
+        return SqliteSink(output or pathlib.Path("scorpion.db"))
+    stream = open(output, "w", newline="", encoding="utf-8") if output else sys.stdout
+    return CsvSink(stream) if output_format == "csv" else JsonlSink(stream)
+
+
 def print_metadata(metadata: dict) -> None:
     for key, value in metadata.items():
-        if key == "EXIF":
+        if isinstance(value, dict):
             print(f"{key}:")
             for exif_key, exif_value in value.items():
                 print(f"  {exif_key:30}: {exif_value}")
@@ -122,29 +969,217 @@ def print_metadata(metadata: dict) -> None:
             print(f"{key:30}: {value}")
 
 
+def print_image_metadata(image_path: pathlib.Path, metadata: dict) -> None:
+    print(SEPARATOR)
+    print(f"Metadata for {Color.SUCCESS}{image_path}{Color.RESET}:")
+    print(SEPARATOR)
+    print_metadata(metadata)
+    print(SEPARATOR)
+
+
+def run_serial(
+    worker: Callable, items: Iterable
+) -> Iterator[Tuple[object, object, Optional[BaseException]]]:
+    """Same contract as run_batch(), in this process."""
+    for item in items:
+        try:
+            yield item, worker(item), None
+        except Exception as e:
+            yield item, None, e
+
+
 def process_images(args: argparse.Namespace) -> None:
+    from tqdm import tqdm
+
+    images = expand_inputs(args.image)
     if args.delete:
         print(SEPARATOR)
         print(f"{Color.WARNING}Deleting metadata{Color.RESET}")
         print(SEPARATOR)
-    for image_path in tqdm(args.image, desc="Processing images"):
-        if args.delete:
-            strip_image_metadata(image_path, args.verbose)
-        else:
+    jobs = args.jobs or os.cpu_count() or 1
+    if args.delete:
+        strip_images(images, args, jobs)
+    elif args.format != "text" or args.index:
+        export_records(images, args, jobs)
+    elif jobs > 1:
+        process_images_parallel(images, args, jobs)
+    else:
+        for image_path in tqdm(images, desc="Processing images", disable=args.quiet):
             metadata = extract_image_metadata(image_path, args.verbose)
             if not metadata:
                 continue
-            print(SEPARATOR)
-            print(f"Metadata for {Color.SUCCESS}{image_path}{Color.RESET}:")
-            print(SEPARATOR)
-            print_metadata(metadata)
-            print(SEPARATOR)
+            print_image_metadata(image_path, metadata)
+
+
+def process_images_parallel(
+    images: List[pathlib.Path], args: argparse.Namespace, jobs: int
+) -> None:
+    from tqdm import tqdm
+
+    worker = functools.partial(extract_image_metadata, verbose=args.verbose)
+    results = run_batch(worker, images, jobs, ordered=not args.unordered)
+    for image_path, metadata, error in tqdm(
+        results, total=len(images), desc="Processing images", disable=args.quiet
+    ):
+        if error is not None:
+            logging.warning(
+                f"{Color.ERROR}Failed to process {image_path}: {error}{Color.RESET}"
+            )
+        elif metadata:
+            print_image_metadata(image_path, metadata)
+
+
+def strip_images(images: List[pathlib.Path], args: argparse.Namespace, jobs: int) -> None:
+    from tqdm import tqdm
+
+    worker = functools.partial(
+        strip_image_metadata,
+        verbose=args.verbose,
+        in_place=args.in_place,
+        preserve=args.preserve,
+    )
+    if jobs > 1:
+        results = run_batch(worker, images, jobs, ordered=not args.unordered)
+    else:
+        results = run_serial(worker, images)
+    counts = Counter()
+    for image_path, stripped, error in tqdm(
+        results, total=len(images), desc="Processing images", disable=args.quiet
+    ):
+        if error is not None:
+            logging.warning(
+                f"{Color.ERROR}Failed to process {image_path}: {error}{Color.RESET}"
+            )
+        counts["failed" if stripped is None else "stripped" if stripped else "clean"] += 1
+    logging.info(
+        f"{Color.INFO}{counts['stripped']} stripped, {counts['clean']} already clean, "
+        f"{counts['failed']} failed{Color.RESET}"
+    )
+
+
+def print_record(record: dict) -> None:
+    camera = " ".join(
+        str(record["exif"][key]) for key in ("Make", "Model") if record["exif"].get(key)
+    )
+    position = (
+        f"{record['latitude']:.6f},{record['longitude']:.6f}"
+        if record["latitude"] is not None and record["longitude"] is not None
+        else ""
+    )
+    print(f"{record['path']}\t{camera}\t{position}")
+
+
+def record_metadata(record: dict, verbose: bool) -> dict:
+    """The text-mode view of a record, as extract_image_metadata() shows it."""
+    import humanize
+
+    metadata = {
+        "Filename": record["filename"],
+        "Size": humanize.naturalsize(record["size"], binary=True),
+        "Creation Date": time.ctime(datetime.datetime.fromisoformat(record["created"]).timestamp()),
+        "Modification Date": time.ctime(record["mtime_ns"] / 1e9),
+        "Permissions": record["permissions"],
+        "Format": record["format"],
+        "Mode": record["mode"],
+        "Image Width": record["width"],
+        "Image Height": record["height"],
+        "EXIF": {
+            key: value for key, value in record["exif"].items() if isinstance(value, str) or verbose
+        },
+    }
+    if record["text"]:
+        metadata["Text"] = record["text"]
+    return metadata
+
+
+def export_records(images: List[pathlib.Path], args: argparse.Namespace, jobs: int) -> None:
+    """Write one record per image to the chosen sink as soon as it is extracted.
+
+    With --index, files whose size, mtime and inode are unchanged are taken
+    from the index instead of being parsed again, and new results are stored.
+    Without a sink (--format text), each record is printed like a plain scan.
+    """
+    from tqdm import tqdm
+
+    index = MetadataIndex(args.index) if args.index else None
+    sink = open_sink(args.format, args.output) if args.format != "text" else None
+    stale, reused, failed = images, 0, 0
+    try:
+        if index:
+            stale = []
+            images = [pathlib.Path(os.path.abspath(image_path)) for image_path in images]
+            for image_path in images:
+                record = index.lookup(image_path)
+                if record is None:
+                    stale.append(image_path)
+                    continue
+                reused += 1
+                if sink:
+                    sink.write(record)
+                else:
+                    print_image_metadata(image_path, record_metadata(record, args.verbose))
+
+        if jobs > 1:
+            results = run_batch(extract_record, stale, jobs, ordered=not args.unordered)
+        else:
+            results = run_serial(extract_record, stale)
+        for image_path, record, error in tqdm(
+            results, total=len(stale), desc="Processing images", disable=args.quiet
+        ):
+            if error is not None:
+                failed += 1
+                logging.warning(
+                    f"{Color.ERROR}Could not read metadata from {image_path}: {error}{Color.RESET}"
+                )
+                continue
+            if index:
+                index.write(record)
+            if sink:
+                sink.write(record)
+            else:
+                print_image_metadata(image_path, record_metadata(record, args.verbose))
+
+        if index:
+            seen = {str(image_path) for image_path in images}
+            pruned = sum(
+                index.prune(pathlib.Path(os.path.abspath(root)), seen)
+                for root in args.image
+                if root.is_dir()
+            )
+            logging.info(
+                f"{Color.INFO}{len(images)} files: {reused} from the index, "
+                f"{len(stale) - failed} parsed, {failed} failed, {pruned} removed{Color.RESET}"
+            )
+    finally:
+        if sink:
+            sink.close()
+        if index:
+            index.close()
+
+
+def query_index(args: argparse.Namespace) -> None:
+    index = MetadataIndex(args.index)
+    sink = open_sink(args.format, args.output) if args.format != "text" else None
+    try:
+        for record in index.query(args.has_gps, args.camera):
+            if sink:
+                sink.write(record)
+            else:
+                print_record(record)
+    finally:
+        if sink:
+            sink.close()
+        index.close()
 
 
 def main() -> None:
-    print_header()
     args = parse_args()
-    process_images(args)
+    if not args.quiet and (args.format == "text" or args.output or args.delete):
+        print_header()  # Keep stdout clean when records are streamed to it
+    if args.query:
+        query_index(args)
+    else:
+        process_images(args)
 
 
 if __name__ == "__main__":
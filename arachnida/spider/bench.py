@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import pathlib
+import queue
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import spider
+from spider import PARSERS, Color, parse_page
+
+BASE_URL = "http://bench.local/"
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Spider benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parse = commands.add_parser("parse", help="Compare the HTML extraction backends")
+    parse.add_argument(
+        "files", type=pathlib.Path, nargs="*", help="HTML files to parse (default synthetic)"
+    )
+    parse.add_argument("--pages", default=200, type=int, help="Synthetic pages (default 200)")
+    parse.add_argument("--images", default=40, type=int, help="Images per page (default 40)")
+    parse.add_argument("--links", default=120, type=int, help="Links per page (default 120)")
+    parse.add_argument(
+        "--filler", default=400, type=int, help="Filler paragraphs per page (default 400)"
+    )
+    parse.add_argument(
+        "--parsers",
+        nargs="+",
+        default=list(PARSERS),
+        choices=list(PARSERS),
+        help="Backends to compare (default all)",
+    )
+
+    crawl = commands.add_parser(
+        "crawl", help="Crawl a local synthetic site with each backend and worker count"
+    )
+    crawl.add_argument("--pages", default=200, type=int, help="Pages on the site (default 200)")
+    crawl.add_argument("--fanout", default=4, type=int, help="Links per page (default 4)")
+    crawl.add_argument("--images", default=10, type=int, help="Images per page (default 10)")
+    crawl.add_argument(
+        "--image-size", default=32 * 1024, type=int, help="Bytes per image (default 32 KiB)"
+    )
+    crawl.add_argument(
+        "--latency", default=0.02, type=float, help="Seconds added to every response (default 0.02)"
+    )
+    crawl.add_argument(
+        "--error-rate", default=0.0, type=float, help="Fraction of requests answered with a 500"
+    )
+    crawl.add_argument("--level", default=10, type=int, help="Crawl depth (default 10)")
+    crawl.add_argument(
+        "--backends",
+        nargs="+",
+        default=["serial", "threads", "async"],
+        choices=["serial", "threads", "async"],
+        help="Engines to run (default all)",
+    )
+    crawl.add_argument(
+        "--workers", nargs="+", default=[8, 32], type=int, help="Worker counts (default 8 32)"
+    )
+    crawl.add_argument(
+        "--timeout", default=600, type=float, help="Seconds allowed per crawl (default 600)"
+    )
+    crawl.add_argument(
+        "--per-host",
+        default=spider.DEFAULT_PER_HOST,
+        type=int,
+        help=f"Per-host cap passed to spider (default {spider.DEFAULT_PER_HOST})",
+    )
+    return parser.parse_args()
+
+
+def make_page(rng: random.Random, images: int, links: int, filler: int) -> bytes:
+    """Build a page shaped like a typical article: mostly text, some media."""
+    parts = ["<!DOCTYPE html><html><head><title>bench</title>"]
+    parts.append("<script>var x = '<a href=\"/not-a-link\">';</script></head><body>")
+    tags = (
+        [f'<img src="/img/{rng.randrange(10**6)}.jpg" alt="i">' for _ in range(images)]
+        + [f'<a href="/page/{rng.randrange(10**6)}.html">l</a>' for _ in range(links)]
+        + [
+            f'<div class="c{i % 7}"><p>Lorem <b>ipsum</b> dolor sit amet &amp; more '
+            f"text {i}</p></div>"
+            for i in range(filler)
+        ]
+    )
+    rng.shuffle(tags)
+    parts.extend(tags)
+    parts.append("</body></html>")
+    return "".join(parts).encode()
+
+
+def bench_parsers(pages: List[bytes], parsers: List[str]) -> None:
+    """Report pages/sec, MB/sec and peak allocation for each backend."""
+    total_mb = sum(len(page) for page in pages) / (1024 * 1024)
+    largest = max(pages, key=len)
+    print(f"{len(pages)} pages, {total_mb:.2f} MB")
+    print(f"{'parser':10} {'pages/s':>10} {'MB/s':>8} {'peak KiB':>10} {'images':>8} {'links':>8}")
+
+    for name in parsers:
+        try:
+            parse_page(BASE_URL, largest, name)
+        except RuntimeError as e:
+            print(f"{Color.WARNING}{name:10} skipped: {e}{Color.RESET}")
+            continue
+
+        images = links = 0
+        start = time.perf_counter()
+        for page in pages:
+            image_urls, page_links = parse_page(BASE_URL, page, name)
+            images += len(image_urls)
+            links += len(page_links)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        parse_page(BASE_URL, largest, name)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(
+            f"{name:10} {len(pages) / elapsed:10.1f} {total_mb / elapsed:8.2f} "
+            f"{peak / 1024:10.0f} {images:8} {links:8}"
+        )
+
+
+class SyntheticSite(BaseHTTPRequestHandler):
+    """Deterministic site: /page/<n>.html pages linking to children and images."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like real servers
+    pages = 200
+    fanout = 4
+    images = 10
+    image_size = 32 * 1024
+    latency = 0.0
+    error_rate = 0.0
+
+    def do_GET(self) -> None:
+        time.sleep(self.latency)
+        if self.path == "/robots.txt":
+            self._send(b"User-agent: *\nAllow: /\n", "text/plain")
+        elif random.random() < self.error_rate:
+            self._send(b"injected error", "text/plain", 500)
+        elif self.path.startswith("/page/"):
+            self._send(self._page(int(self.path[6:].split(".")[0])), "text/html")
+        elif self.path.startswith("/img/"):
+            # Unique bytes per image, so the content-addressed store keeps them all
+            body = b"\xff\xd8\xff" + self.path.encode().ljust(self.image_size - 3, b"\0")
+            self._send(body, "image/jpeg")
+        else:
+            self._send(b"not found", "text/plain", 404)
+
+    def _page(self, number: int) -> bytes:
+        # Children form a tree so every page is reachable; one extra link points back
+        children = range(number * self.fanout + 1, number * self.fanout + self.fanout + 1)
+        links = [child for child in children if child < self.pages] + [number // 2]
+        parts = ["<html><body>"]
+        parts += [f'<a href="/page/{link}.html">{link}</a>' for link in links]
+        parts += [f'<img src="/img/{number}-{i}.jpg">' for i in range(self.images)]
+        parts.append("</body></html>")
+        return "".join(parts).encode()
+
+    def _send(self, body: bytes, content_type: str, status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def run_crawl(argv: List[str], results: multiprocessing.Queue) -> None:
+    """Run spider.main() in a fresh process and report its throughput."""
+    with tempfile.TemporaryDirectory() as save_dir:
+        metrics_path = pathlib.Path(save_dir) / "metrics.jsonl"
+        sys.argv = ["spider", "-p", save_dir, "--metrics", str(metrics_path), *argv]
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            with contextlib.redirect_stderr(devnull):
+                start = time.perf_counter()
+                spider.main()
+                elapsed = time.perf_counter() - start
+        with open(metrics_path) as events:
+            summary = json.loads(events.readlines()[-1])
+    results.put(
+        {
+            "elapsed": elapsed,
+            "pages": summary["latency"].get("page", {}).get("count", 0),
+            "images": spider.total_downloads,
+            "bytes": sum(summary["bytes_per_host"].values()),
+            "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        }
+    )
+
+
+def wait_for_result(
+    crawl: multiprocessing.Process, results: multiprocessing.Queue, timeout: float
+) -> Optional[Dict]:
+    """The crawl's result, or None if it died or ran out of time (it is then killed)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            result = results.get(timeout=1)
+        except queue.Empty:
+            if not crawl.is_alive():
+                break
+            continue
+        crawl.join()
+        return result
+    if crawl.is_alive():
+        crawl.terminate()
+    crawl.join()
+    return None
+
+
+def bench_crawl(args: argparse.Namespace) -> None:
+    """Serve a synthetic site and crawl it with every backend/worker combination."""
+    SyntheticSite.pages = args.pages
+    SyntheticSite.fanout = args.fanout
+    SyntheticSite.images = args.images
+    SyntheticSite.image_size = args.image_size
+    SyntheticSite.latency = args.latency
+    SyntheticSite.error_rate = args.error_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SyntheticSite)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/page/0.html"
+
+    runs: List[Tuple[str, int, List[str]]] = []
+    for backend in args.backends:
+        if backend == "serial":
+            runs.append((backend, 1, []))
+        for workers in args.workers if backend != "serial" else []:
+            flags = ["--async"] if backend == "async" else []
+            runs.append((backend, workers, flags + ["-w", str(workers)]))
+
+    print(
+        f"{args.pages} pages x {args.images} images of {args.image_size / 1024:.0f} KiB, "
+        f"{args.latency * 1000:.0f} ms latency, {args.error_rate:.0%} errors, "
+        f"{args.per_host} requests per host"
+    )
+    print(
+        f"{'backend':8} {'workers':>7} {'seconds':>8} {'pages/s':>8} "
+        f"{'images/s':>9} {'MB/s':>7} {'peak RSS MB':>12}"
+    )
+    context = multiprocessing.get_context("spawn")
+    for backend, workers, flags in runs:
+        results = context.Queue()
+        crawl = context.Process(
+            target=run_crawl, args=(
+                flags + ["--per-host", str(args.per_host), "-r", "-l", str(args.level), url],
+                results,
+            ),
+        )
+        crawl.start()
+        result = wait_for_result(crawl, results, args.timeout)
+        if result is None:
+            print(
+                f"{Color.ERROR}{backend:8} {workers:7} crawl failed "
+                f"(exit code {crawl.exitcode}){Color.RESET}"
+            )
+            continue
+        elapsed = result["elapsed"]
+        print(
+            f"{backend:8} {workers:7} {elapsed:8.2f} {result['pages'] / elapsed:8.1f} "
+            f"{result['images'] / elapsed:9.1f} {result['bytes'] / elapsed / 2**20:7.2f} "
+            f"{result['peak_rss'] / 2**20:12.1f}"
+        )
+    server.shutdown()
+
+
+def main() -> None:
+    args = parse_arguments()
+    if args.command == "crawl":
+        bench_crawl(args)
+    if args.command == "parse":
+        if args.files:
+            pages = [path.read_bytes() for path in args.files]
+        else:
+            rng = random.Random(42)
+            pages = [
+                make_page(rng, args.images, args.links, args.filler)
+                for _ in range(args.pages)
+            ]
+        bench_parsers(pages, args.parsers)
+
+
+if __name__ == "__main__":
+    main()
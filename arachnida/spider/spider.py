@@ -1,14 +1,28 @@
 #!/usr/bin/env python3
 
 import argparse
+import functools
 import pathlib
 import os
-import requests
-from urllib.parse import urljoin, urlparse
+import re
+import sys
+import hashlib
+import json
+import math
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from urllib.parse import urldefrag, urljoin, urlparse
 from urllib import robotparser
-from bs4 import BeautifulSoup
-from typing import Set
-from tqdm import tqdm  # For progress visualization
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+# requests, bs4, tqdm and asyncio are imported by the code paths that use them,
+# so that --help and argument errors come back without paying for them.
 
 # Constants
 DEFAULT_DEPTH = 5
@@ -16,6 +30,37 @@ DEFAULT_PATH = "./data"
 EXTENSIONS = [".jpg", ".jpeg", ".png", ".gif", ".bmp"]
 USER_AGENT = "42SpiderBot"
 MAX_IMAGE_SIZE_MB = 5  # Skip images larger than 5MB
+MAX_IMAGE_SIZE = MAX_IMAGE_SIZE_MB * 1024 * 1024
+CHUNK_SIZE = 64 * 1024  # Bytes read at a time when streaming images
+INDEX_FILE = ".spider_index.jsonl"  # URL -> content digest index in the save dir
+STATE_FILE = ".spider_state.db"  # Crawl journal used by --resume
+DEFAULT_WORKERS = 1  # 1 keeps the original serial crawl
+DEFAULT_PER_HOST = 4  # Max in-flight requests per host in concurrent mode
+DEFAULT_ASYNC_WORKERS = 100  # Open connections for the asyncio backend
+ROBOTS_TTL = 3600  # Seconds before a host's robots.txt is fetched again
+ROBOTS_CACHE_SIZE = 256  # Hosts whose robots.txt rules are kept in memory
+DEFAULT_PARSER = "stream"  # HTML backend, see PARSERS
+SNIFF_SIZE = 16  # Bytes needed to recognise an extensionless image
+METADATA_FILE = ".spider_metadata.jsonl"  # Records written by --hook extract
+HOOK_HEAD_SIZE = 128 * 1024  # Bytes kept in memory for --hook extract, covers Exif APP1
+SCORPION_DIR = pathlib.Path(__file__).resolve().parent.parent / "scorpion"
+# Content types and magic numbers of the supported image formats
+IMAGE_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/bmp": ".bmp",
+}
+MAGIC_NUMBERS = [
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"BM", ".bmp"),
+]
+# One srcset candidate: a URL, then either trailing commas or a descriptor
+SRCSET_CANDIDATE = re.compile(r"([^\s,]\S*?)(?:,+(?=\s|$)|\s+([^,]*)(?:,|$)|$)")
+CSS_URL = re.compile(r"url\(\s*(['\"]?)(.*?)\1\s*\)", re.IGNORECASE)
 
 HEADER = """
  @@@@@@   @@@@@@@   @@@  @@@@@@@   @@@@@@@@  @@@@@@@   
@@ -33,6 +78,7 @@ HEADER = """
 
 # Global variables
 total_downloads: int = 0
+downloads_lock = threading.Lock()
 
 
 # Colors for terminal output
@@ -70,9 +116,620 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Enable verbose output"
     )
+    parser.add_argument(
+        "--parser",
+        choices=["stream", "lxml", "bs4"],
+        default=DEFAULT_PARSER,
+        help=f"HTML extraction backend (default {DEFAULT_PARSER}; lxml needs lxml)",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=pathlib.Path,
+        help="Write per-fetch metrics as JSON lines, ending with a summary",
+    )
+    parser.add_argument(
+        "--hook",
+        choices=["extract", "strip"],
+        help=f"Run scorpion on each downloaded image: extract its metadata to {METADATA_FILE} "
+        "or strip it in place",
+    )
+    parser.add_argument(
+        "--hook-workers",
+        default=os.cpu_count() or 1,
+        type=int,
+        help="Processes running the --hook (default one per CPU)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the crawl journaled in the save directory",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=DEFAULT_WORKERS,
+        type=int,
+        help=(
+            f"Number of concurrent page/image fetches (default {DEFAULT_WORKERS}, "
+            f"{DEFAULT_ASYNC_WORKERS} with --async)"
+        ),
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Use the asyncio backend with keep-alive connection pools (needs aiohttp)",
+    )
+    parser.add_argument(
+        "--per-host",
+        default=DEFAULT_PER_HOST,
+        type=int,
+        help=f"Max concurrent requests per host (default {DEFAULT_PER_HOST})",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        "--no-banner",
+        action="store_true",
+        help="Don't print the banner or progress bars",
+    )
     return parser.parse_args()
 
 
+class VisitedSet:
+    """Thread-safe set of URLs that have already been claimed by a worker."""
+
+    def __init__(self) -> None:
+        self._urls: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def claim(self, url: str) -> bool:
+        """Mark a URL as visited, returning False if it already was."""
+        with self._lock:
+            if url in self._urls:
+                return False
+            self._urls.add(url)
+            return True
+
+    def __contains__(self, url: object) -> bool:
+        with self._lock:
+            return url in self._urls
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._urls)
+
+
+class HostLimiter:
+    """Cap the number of in-flight requests to each host."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, limit)
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._slots.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.limit)
+                self._slots[host] = semaphore
+        with semaphore:
+            yield
+
+
+class CrawlJournal:
+    """SQLite journal of the crawl frontier and of HTTP validators.
+
+    Lets an interrupted crawl resume where it stopped, and turns re-crawls of
+    unchanged pages and images into conditional requests answered with a 304.
+    Pages also keep the image URLs and links they held, so a 304 page can
+    still be expanded without its body.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.executescript(
+                """
+                PRAGMA journal_mode = WAL;
+                CREATE TABLE IF NOT EXISTS frontier (
+                    url TEXT PRIMARY KEY,
+                    depth INTEGER NOT NULL,
+                    done INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS resources (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    images TEXT,
+                    links TEXT
+                );
+                """
+            )
+
+    def start(self, url: str) -> None:
+        """Forget the previous frontier and start a new crawl from url."""
+        with self._lock:
+            self._db.execute("DELETE FROM frontier")
+            self._db.execute("INSERT INTO frontier (url, depth) VALUES (?, 0)", (url,))
+            self._db.commit()
+
+    def load_frontier(self) -> List[Tuple[str, int, bool]]:
+        with self._lock:
+            rows = self._db.execute("SELECT url, depth, done FROM frontier").fetchall()
+        return [(url, depth, bool(done)) for url, depth, done in rows]
+
+    def queue(self, urls: List[str], depth: int) -> None:
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO frontier (url, depth) VALUES (?, ?)",
+                [(url, depth) for url in urls],
+            )
+
+    def mark_done(self, url: str) -> None:
+        with self._lock:
+            self._db.execute("UPDATE frontier SET done = 1 WHERE url = ?", (url,))
+            self._db.commit()
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Return the conditional request headers for a previously fetched URL."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified FROM resources WHERE url = ?", (url,)
+            ).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def cached_page(self, url: str) -> Tuple[List[str], Set[str]]:
+        """Return the image URLs and links recorded for a page."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT images, links FROM resources WHERE url = ?", (url,)
+            ).fetchone()
+        if not row or row[0] is None:
+            raise ValueError(f"no journaled copy of {url}")
+        return json.loads(row[0]), set(json.loads(row[1]))
+
+    def record(
+        self,
+        url: str,
+        headers,
+        images: Optional[List[str]] = None,
+        links: Optional[Set[str]] = None,
+    ) -> None:
+        """Remember the validators (and for pages, the contents) of a response."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?)",
+                (
+                    url,
+                    headers.get("ETag"),
+                    headers.get("Last-Modified"),
+                    None if images is None else json.dumps(images),
+                    None if links is None else json.dumps(sorted(links)),
+                ),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+
+class Frontier:
+    """Breadth-first, level-synchronous crawl frontier.
+
+    Levels are expanded one at a time, so the first level a URL is found at is
+    also its shallowest one and every page is fetched exactly once. Every
+    change is written to the journal so the crawl can be resumed.
+    """
+
+    def __init__(
+        self, url: str, max_depth: int, journal: CrawlJournal, resume: bool = False
+    ) -> None:
+        self.max_depth = max_depth
+        self.journal = journal
+        self.depths: Dict[str, int] = {}  # Best depth for each URL seen
+        self.pages_per_level: Dict[int, int] = {}
+        self._pending: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+
+        entries = journal.load_frontier() if resume else []
+        if not entries:
+            journal.start(url)
+            entries = [(url, 0, False)]
+        for page_url, depth, done in entries:
+            self.depths[page_url] = depth
+            if not done:
+                self._pending.setdefault(depth, []).append(page_url)
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(urls) for urls in self._pending.values())
+
+    def levels(self) -> Iterator[Tuple[int, List[str]]]:
+        """Yield (level, urls) until the frontier is empty or too deep."""
+        level = min(self._pending, default=0)
+        while self._pending and level <= self.max_depth:
+            with self._lock:
+                urls = self._pending.pop(level, [])
+                self.pages_per_level[level] = 0
+            yield level, urls
+            level += 1
+
+    def discover(self, links: Set[str], level: int) -> None:
+        """Queue the links found on a page of the given level."""
+        if level >= self.max_depth:
+            return
+        with self._lock:
+            new_links = [link for link in links if link not in self.depths]
+            for link in new_links:
+                self.depths[link] = level + 1
+                self._pending.setdefault(level + 1, []).append(link)
+        self.journal.queue(new_links, level + 1)
+
+    def mark_fetched(self, url: str, level: int, downloads: Sequence = ()) -> None:
+        """Count a fetched page and journal it as done once its images are."""
+        with self._lock:
+            self.pages_per_level[level] += 1
+        if not downloads:
+            self.journal.mark_done(url)
+            return
+
+        remaining = [len(downloads)]
+
+        def download_finished(download) -> None:
+            if download.cancelled():
+                return  # Interrupted: the page stays pending for --resume
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.journal.mark_done(url)
+
+        for download in downloads:
+            download.add_done_callback(download_finished)
+
+    def mark_skipped(self, url: str) -> None:
+        """Journal a page that will never be fetched (robots.txt) as done."""
+        self.journal.mark_done(url)
+
+
+class RobotsCache:
+    """Per-host robots.txt rules with a TTL, LRU eviction and crawl-delay pacing.
+
+    Every fetch consults the cache, so robots.txt is downloaded once per host
+    (until it expires) and requests to a host honour its Crawl-delay even when
+    several workers target it at once.
+    """
+
+    def __init__(self, ttl: float = ROBOTS_TTL, max_hosts: int = ROBOTS_CACHE_SIZE) -> None:
+        self.ttl = ttl
+        self.max_hosts = max_hosts
+        self._rules: "OrderedDict[str, Tuple[float, robotparser.RobotFileParser]]" = (
+            OrderedDict()
+        )
+        self._next_request: Dict[str, float] = {}  # host -> earliest next request
+        self._lock = threading.Lock()
+        self._host_locks: Dict[str, threading.Lock] = {}
+
+    def rules(self, url: str) -> robotparser.RobotFileParser:
+        """Return the cached robots.txt rules for url's host, fetching if needed."""
+        base_url = f"{urlparse(url).scheme}://{urlparse(url).netloc}"
+        with self._lock:
+            host_lock = self._host_locks.setdefault(base_url, threading.Lock())
+        # One fetch per host even when many workers ask at the same time
+        with host_lock:
+            with self._lock:
+                cached = self._rules.get(base_url)
+                if cached and cached[0] > time.monotonic():
+                    self._rules.move_to_end(base_url)
+                    return cached[1]
+            parser = self._fetch(base_url)
+            with self._lock:
+                self._rules[base_url] = (time.monotonic() + self.ttl, parser)
+                self._rules.move_to_end(base_url)
+                while len(self._rules) > self.max_hosts:
+                    evicted, _ = self._rules.popitem(last=False)
+                    self._host_locks.pop(evicted, None)
+        return parser
+
+    def _fetch(self, base_url: str) -> robotparser.RobotFileParser:
+        import requests
+
+        parser = robotparser.RobotFileParser(f"{base_url}/robots.txt")
+        try:
+            response = requests.get(
+                parser.url, headers={"User-Agent": USER_AGENT}, timeout=10
+            )
+        except requests.RequestException:
+            parser.allow_all = True
+            return parser
+        # Same status handling as RobotFileParser.read()
+        if response.status_code in (401, 403):
+            parser.disallow_all = True
+        elif 400 <= response.status_code < 500:
+            parser.allow_all = True
+        else:
+            parser.parse(response.text.splitlines())
+        return parser
+
+    def allowed(self, url: str) -> bool:
+        return self.rules(url).can_fetch(USER_AGENT, url)
+
+    def reserve(self, url: str) -> float:
+        """Check url against robots.txt and book the next request slot for its host.
+
+        Returns how many seconds to wait before sending the request.
+        """
+        rules = self.rules(url)
+        if not rules.can_fetch(USER_AGENT, url):
+            raise PermissionError(f"Access to {url} is disallowed by robots.txt")
+        crawl_delay = rules.crawl_delay(USER_AGENT)
+        if not crawl_delay:
+            return 0.0
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_request.get(host, now))
+            self._next_request[host] = start + float(crawl_delay)
+        return start - now
+
+    def wait(self, url: str) -> None:
+        time.sleep(self.reserve(url))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values (0 when there are none)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class FetchRecord:
+    """Timings and outcome of one request, filled in while it runs.
+
+    Phases are seconds: dns and connect (asyncio backend only), ttfb from the
+    request start to the response headers, body for reading the rest and
+    write for the time spent on disk.
+    """
+
+    def __init__(self, metrics: "CrawlMetrics", url: str, kind: str) -> None:
+        self.metrics = metrics
+        self.url = url
+        self.kind = kind
+        self.status: Optional[int] = None
+        self.size = 0
+        self.phases: Dict[str, float] = {}
+        self.start = time.perf_counter()
+
+    def __enter__(self) -> "FetchRecord":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        total = time.perf_counter() - self.start
+        if "ttfb" in self.phases:
+            self.phases["body"] = max(
+                0.0, total - self.phases["ttfb"] - self.phases.get("write", 0.0)
+            )
+        self.metrics.record(self, total, "error" if self.status is None else self.status)
+
+
+class CrawlMetrics:
+    """Thread-safe crawl instrumentation.
+
+    Collects per-phase timings, fetch latencies, bytes per host, status codes
+    and queue depth. With a path, every fetch is also streamed there as a JSON
+    line, and close() appends the final summary.
+    """
+
+    def __init__(self, path: Optional[pathlib.Path] = None) -> None:
+        self.phases: Dict[str, List[float]] = defaultdict(list)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.bytes_per_host: Counter = Counter()
+        self.status_codes: Counter = Counter()
+        self.queue_depth: List[Dict[str, int]] = []
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._events = open(path, "w") if path else None
+
+    def fetch(self, url: str, kind: str) -> FetchRecord:
+        return FetchRecord(self, url, kind)
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[phase].append(time.perf_counter() - start)
+
+    def record(self, fetch: FetchRecord, total: float, status) -> None:
+        with self._lock:
+            self.latencies[fetch.kind].append(total)
+            for phase, seconds in fetch.phases.items():
+                self.phases[phase].append(seconds)
+            self.bytes_per_host[urlparse(fetch.url).netloc] += fetch.size
+            self.status_codes[str(status)] += 1
+        self._emit(
+            {
+                "event": "fetch",
+                "kind": fetch.kind,
+                "url": fetch.url,
+                "status": status,
+                "bytes": fetch.size,
+                "total": round(total, 6),
+                **{phase: round(seconds, 6) for phase, seconds in fetch.phases.items()},
+            }
+        )
+
+    def sample_queue(self, level: int, pages: int, downloads: int) -> None:
+        """Record how much work is queued when a level starts."""
+        sample = {"level": level, "pages": pages, "downloads": downloads}
+        with self._lock:
+            self.queue_depth.append(sample)
+        self._emit({"event": "queue", **sample})
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "elapsed": round(time.perf_counter() - self.started, 3),
+                "latency": {
+                    kind: {
+                        "count": len(values),
+                        "p50": round(percentile(values, 50), 6),
+                        "p95": round(percentile(values, 95), 6),
+                        "p99": round(percentile(values, 99), 6),
+                    }
+                    for kind, values in self.latencies.items()
+                },
+                "phases": {
+                    phase: {
+                        "count": len(values),
+                        "total": round(sum(values), 6),
+                        "p50": round(percentile(values, 50), 6),
+                        "p95": round(percentile(values, 95), 6),
+                    }
+                    for phase, values in self.phases.items()
+                },
+                "bytes_per_host": dict(self.bytes_per_host),
+                "status_codes": dict(self.status_codes),
+                "queue_depth": list(self.queue_depth),
+            }
+
+    def _emit(self, event: Dict) -> None:
+        if self._events is not None:
+            with self._lock:
+                self._events.write(json.dumps(event) + "\n")
+
+    def close(self) -> Dict:
+        """Write the summary event, close the event stream and return the summary."""
+        summary = self.summary()
+        self._emit({"event": "summary", **summary})
+        if self._events is not None:
+            self._events.close()
+        return summary
+
+
+def print_metrics(summary: Dict) -> None:
+    """Show where the crawl spent its time."""
+    print(f"{Color.INFO}Crawl took {summary['elapsed']:.2f}s{Color.RESET}")
+    for kind, latency in summary["latency"].items():
+        print(
+            f"{Color.INFO}{kind:6} fetches: {latency['count']:6}  p50 {latency['p50'] * 1000:8.1f} ms"
+            f"  p95 {latency['p95'] * 1000:8.1f} ms  p99 {latency['p99'] * 1000:8.1f} ms{Color.RESET}"
+        )
+    for phase, timing in sorted(summary["phases"].items()):
+        print(
+            f"{Color.INFO}{phase:8} total {timing['total']:8.3f}s  p50 {timing['p50'] * 1000:8.1f} ms"
+            f"  p95 {timing['p95'] * 1000:8.1f} ms{Color.RESET}"
+        )
+    codes = ", ".join(f"{code}: {count}" for code, count in sorted(summary["status_codes"].items()))
+    print(f"{Color.INFO}Status codes: {codes}{Color.RESET}")
+    for host, size in summary["bytes_per_host"].items():
+        print(f"{Color.INFO}{host}: {size / (1024 * 1024):.2f} MB{Color.RESET}")
+
+
+def import_scorpion():
+    """Load scorpion from its sibling directory."""
+    if str(SCORPION_DIR) not in sys.path:
+        sys.path.append(str(SCORPION_DIR))
+    import scorpion
+
+    return scorpion
+
+
+def run_hook(mode: str, path: pathlib.Path, head: bytes, verbose: bool):
+    """Worker side of --hook: extract a metadata record or strip the image in place."""
+    scorpion = import_scorpion()
+    if mode == "extract":
+        return scorpion.extract_record(path, head)
+    return scorpion.strip_image_metadata(path, verbose, in_place=True)
+
+
+class MetadataHook:
+    """Hands every stored image to scorpion in a process pool, off the fetch path.
+
+    extract parses the head bytes captured while the image was streamed, so
+    the file is not read back for common JPEGs, and appends one record per
+    image to METADATA_FILE; strip rewrites the file atomically in place,
+    keeping every frame of animated GIFs and WebPs, and leaves the download
+    untouched (counted as failed) if scorpion cannot rewrite it faithfully.
+    """
+
+    def __init__(self, mode: str, save_dir: pathlib.Path, workers: int, verbose: bool) -> None:
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.mode = mode
+        self.verbose = verbose
+        self.head_size = HOOK_HEAD_SIZE if mode == "extract" else 0
+        self.sink = None
+        if mode == "extract":
+            self.sink = import_scorpion().JsonlSink(open(save_dir / METADATA_FILE, "a"))
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(self, path: pathlib.Path, head: bytes) -> None:
+        future = self._pool.submit(run_hook, self.mode, path, head, self.verbose)
+        future.add_done_callback(functools.partial(self._done, path))
+
+    def _done(self, path: pathlib.Path, future) -> None:
+        error = future.exception()
+        with self._lock:
+            if error is not None:
+                self.counts["failed"] += 1
+                print(f"{Color.ERROR}Hook failed on {path}: {error}{Color.RESET}")
+            elif self.mode == "extract":
+                self.counts["extracted"] += 1
+                self.sink.write(future.result())
+            else:
+                result = future.result()
+                self.counts["failed" if result is None else "stripped" if result else "clean"] += 1
+
+    def close(self) -> None:
+        """Wait for the images still queued, then report."""
+        self._pool.shutdown(wait=True)
+        if self.sink is not None:
+            self.sink.close()
+        counts = ", ".join(f"{count} {name}" for name, count in sorted(self.counts.items()))
+        print(f"{Color.INFO}Hook {self.mode}: {counts or 'no images'}{Color.RESET}")
+
+
+class CrawlContext:
+    """State shared by every fetch of a crawl."""
+
+    def __init__(
+        self,
+        store: "ImageStore",
+        journal: CrawlJournal,
+        robots: RobotsCache,
+        verbose: bool,
+        parser: str = DEFAULT_PARSER,
+        metrics: Optional[CrawlMetrics] = None,
+        quiet: bool = False,
+        hook: Optional[MetadataHook] = None,
+    ) -> None:
+        self.store = store
+        self.journal = journal
+        self.robots = robots
+        self.verbose = verbose
+        self.parser = parser
+        self.metrics = metrics or CrawlMetrics()
+        self.quiet = quiet
+        self.hook = hook
+
+
 def validate_url(url: str) -> str:
     """Ensure URL is valid and has a scheme."""
     parsed = urlparse(url)
@@ -91,126 +748,830 @@ def validate_save_path(path: pathlib.Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
-def check_robots_txt(url: str) -> None:
-    """Check the site's robots.txt for permissions."""
-    base_url = f"{urlparse(url).scheme}://{urlparse(url).netloc}"
-    robots_url = f"{base_url}/robots.txt"
-    parser = robotparser.RobotFileParser()
-    parser.set_url(robots_url)
-    parser.read()
-    if not parser.can_fetch(USER_AGENT, url):
-        raise PermissionError(f"Access to {url} is disallowed by robots.txt")
-
-
 def fetch_content(url: str) -> bytes:
     """Fetch content from a URL."""
+    import requests
+
     headers = {"User-Agent": USER_AGENT}
     response = requests.get(url, headers=headers, timeout=10)
     response.raise_for_status()
     return response.content
 
 
-def save_image(url: str, save_dir: pathlib.Path) -> bool:
-    """Download and save an image."""
-    global total_downloads
-    image_name = os.path.basename(urlparse(url).path)
-    save_path = save_dir / image_name
+class ImageStore:
+    """Content-addressed store for downloaded images.
 
-    if save_path.exists():
-        print(f"{Color.WARNING}Image already exists: {save_path}{Color.RESET}")
-        return False
+    Every distinct image body is kept once, under its URL's basename or, when
+    that name already holds different content, the basename plus a digest
+    suffix. A URL -> digest index is appended to INDEX_FILE so later runs skip
+    URLs they already hold.
+    """
 
-    try:
-        content = fetch_content(url)
-        size_mb = len(content) / (1024 * 1024)
-        if size_mb > MAX_IMAGE_SIZE_MB:
-            print(
-                f"{Color.WARNING}Skipping large image ({size_mb:.2f} MB): {url}{Color.RESET}"
-            )
-            return False
+    def __init__(self, save_dir: pathlib.Path) -> None:
+        self.save_dir = save_dir
+        self.index_path = save_dir / INDEX_FILE
+        self.urls: Dict[str, str] = {}  # url -> digest
+        self.files: Dict[str, str] = {}  # digest -> file name
+        self._lock = threading.Lock()
+        # Temp files are created 0600; stored images get what a plain new file
+        # would. The umask is read once here, before any worker thread runs.
+        umask = os.umask(0)
+        os.umask(umask)
+        self.file_mode = 0o666 & ~umask
+        if self.index_path.exists():
+            with open(self.index_path, "r") as index:
+                for line in index:
+                    entry = json.loads(line)
+                    if (save_dir / entry["file"]).exists():
+                        self.urls[entry["url"]] = entry["digest"]
+                        self.files[entry["digest"]] = entry["file"]
+
+    def holds(self, url: str) -> bool:
+        with self._lock:
+            digest = self.urls.get(url)
+            return digest is not None and (self.save_dir / self.files[digest]).exists()
+
+    def add(
+        self, url: str, digest: str, temp_path: str, extension: str
+    ) -> Optional[pathlib.Path]:
+        """Move a finished download into the store.
+
+        Returns the new file, or None if the same content was already stored.
+        """
+        with self._lock:
+            name = self.files.get(digest)
+            if name is not None and (self.save_dir / name).exists():
+                os.unlink(temp_path)
+                self._record(url, digest, name)
+                return None
+            name = self._free_name(url, digest, extension)
+            os.chmod(temp_path, self.file_mode)
+            os.replace(temp_path, self.save_dir / name)
+            self._record(url, digest, name)
+            return self.save_dir / name
+
+    def _free_name(self, url: str, digest: str, extension: str) -> str:
+        name = os.path.basename(urlparse(url).path) or digest
+        if not os.path.splitext(name)[1]:
+            name += extension
+        if (self.save_dir / name).exists():
+            stem, ext = os.path.splitext(name)
+            name = f"{stem}-{digest[:12]}{ext}"
+        return name
+
+    def _record(self, url: str, digest: str, name: str) -> None:
+        self.urls[url] = digest
+        self.files[digest] = name
+        with open(self.index_path, "a") as index:
+            index.write(json.dumps({"url": url, "digest": digest, "file": name}) + "\n")
+
+
+class ImageTooLarge(Exception):
+    """Raised as soon as an image is known to exceed MAX_IMAGE_SIZE_MB."""
 
-        with open(save_path, "wb") as file:
-            file.write(content)
-        total_downloads += 1
+    def __init__(self, size: int) -> None:
+        super().__init__(f"{size / (1024 * 1024):.2f} MB")
+
+
+class NotAnImage(Exception):
+    """Raised when an extensionless URL turns out not to be a supported image."""
+
+
+def sniff_image_type(content_type: Optional[str], head: bytes) -> Optional[str]:
+    """Return the extension of a supported image from its first bytes or type."""
+    for magic, ext in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return ext
+    return IMAGE_TYPES.get((content_type or "").split(";")[0].strip().lower())
+
+
+class PartialImage:
+    """Temporary file an image is streamed and hashed into before being stored.
+
+    Extensionless URLs are classified from the Content-Type and the magic
+    bytes of the first chunk, and abandoned right away if they are not images.
+    """
+
+    def __init__(
+        self, store: ImageStore, url: str, headers, hook: Optional[MetadataHook] = None
+    ) -> None:
+        content_length = headers.get("Content-Length")
+        if content_length and int(content_length) > MAX_IMAGE_SIZE:
+            raise ImageTooLarge(int(content_length))
+        self.store = store
+        self.url = url
+        self.size = 0
+        self.extension = image_extension(url) or None
+        self._content_type = headers.get("Content-Type")
+        self._head = b""
+        self.hook = hook
+        self.head = b""  # First bytes, kept for the hook
+        self.write_time = 0.0
+        self._hash = hashlib.sha256()
+        self._file = tempfile.NamedTemporaryFile(
+            dir=store.save_dir, prefix=".", suffix=".part", delete=False
+        )
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > MAX_IMAGE_SIZE:
+            raise ImageTooLarge(self.size)
+        if self.extension is None and len(self._head) < SNIFF_SIZE:
+            self._head += chunk[:SNIFF_SIZE]
+            if len(self._head) >= SNIFF_SIZE:
+                self._classify()
+        if self.hook is not None and len(self.head) < self.hook.head_size:
+            self.head += chunk[: self.hook.head_size - len(self.head)]
+        self._hash.update(chunk)
+        start = time.perf_counter()
+        self._file.write(chunk)
+        self.write_time += time.perf_counter() - start
+
+    def _classify(self) -> None:
+        self.extension = sniff_image_type(self._content_type, self._head)
+        if self.extension is None:
+            raise NotAnImage(self._content_type or "unknown type")
+
+    def commit(self) -> bool:
+        """Hand the finished download to the store, which renames it atomically."""
+        global total_downloads
+        if self.extension is None:
+            self._classify()
+        start = time.perf_counter()
+        self._file.close()
+        save_path = self.store.add(
+            self.url, self._hash.hexdigest(), self._file.name, self.extension
+        )
+        self.write_time += time.perf_counter() - start
+        if save_path is None:
+            print(f"{Color.WARNING}Image content already stored: {self.url}{Color.RESET}")
+            return False
+        with downloads_lock:
+            total_downloads += 1
         print(f"{Color.SUCCESS}Image downloaded: {save_path}{Color.RESET}")
+        if self.hook is not None:
+            self.hook.submit(save_path, self.head)
         return True
+
+    def __enter__(self) -> "PartialImage":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        # Leftover temp files only exist if commit() was never reached
+        self._file.close()
+        if os.path.exists(self._file.name):
+            os.unlink(self._file.name)
+
+
+def save_image(url: str, ctx: CrawlContext) -> bool:
+    """Stream an image to disk, giving up as soon as it is too large."""
+    import requests
+
+    validators = ctx.journal.validators(url) if ctx.store.holds(url) else {}
+    if ctx.store.holds(url) and not validators:
+        print(f"{Color.WARNING}Image already downloaded: {url}{Color.RESET}")
+        return False
+
+    try:
+        ctx.robots.wait(url)
+        headers = {"User-Agent": USER_AGENT, **validators}
+        with ctx.metrics.fetch(url, "image") as fetch, requests.get(
+            url, headers=headers, timeout=10, stream=True
+        ) as response:
+            fetch.status = response.status_code
+            fetch.phases["ttfb"] = response.elapsed.total_seconds()
+            if response.status_code == 304:
+                print(f"{Color.INFO}Image not modified: {url}{Color.RESET}")
+                return False
+            response.raise_for_status()
+            with PartialImage(ctx.store, url, response.headers, ctx.hook) as image:
+                try:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        image.write(chunk)
+                    saved = image.commit()
+                finally:
+                    fetch.size = image.size
+                    fetch.phases["write"] = image.write_time
+            ctx.journal.record(url, response.headers)
+            return saved
+    except ImageTooLarge as e:
+        print(f"{Color.WARNING}Skipping large image ({e}): {url}{Color.RESET}")
+        return False
+    except NotAnImage as e:
+        print(f"{Color.WARNING}Skipping non-image ({e}): {url}{Color.RESET}")
+        return False
     except Exception as e:
         print(f"{Color.ERROR}Failed to download {url}: {e}{Color.RESET}")
         return False
 
 
-def extract_images(url: str, soup: BeautifulSoup, save_dir: pathlib.Path) -> int:
-    """Extract and download images from a page."""
-    images = soup.find_all("img")
-    download_count = 0
+def parse_srcset(srcset: Optional[str]) -> List[Tuple[str, float]]:
+    """Split a srcset attribute into (url, size) candidates.
+
+    The size is the width for "640w" descriptors, the density for "2x" ones
+    and 1 for candidates without a descriptor.
+    """
+    candidates = []
+    for match in SRCSET_CANDIDATE.finditer(srcset or ""):
+        descriptor = (match.group(2) or "").strip().lower()
+        try:
+            size = float(descriptor[:-1]) if descriptor[-1:] in ("w", "x") else 1.0
+        except ValueError:
+            size = 1.0
+        candidates.append((match.group(1), size))
+    return candidates
+
+
+class PageScan:
+    """Collect image candidates and links from a stream of tag events.
+
+    Every backend feeds the same events, so they all agree on what a page
+    holds. Each entry of images is a group of alternative renditions of one
+    image (an img with its srcset, or a whole picture element) of which only
+    the best one is downloaded. A candidate's size is None for a plain src.
+    """
+
+    def __init__(self) -> None:
+        self.images: List[List[Tuple[str, Optional[float]]]] = []
+        self.hrefs: List[str] = []
+        self._picture: Optional[List[Tuple[str, Optional[float]]]] = None
+        self._in_style = False
+
+    def start(self, tag: str, attrs: Dict[str, Optional[str]]) -> None:
+        if attrs.get("style"):
+            self._scan_css(attrs["style"])
+        if tag == "a":
+            if attrs.get("href"):
+                self.hrefs.append(attrs["href"])
+        elif tag == "img":
+            candidates: List[Tuple[str, Optional[float]]] = list(
+                parse_srcset(attrs.get("srcset"))
+            )
+            if attrs.get("src"):
+                candidates.append((attrs["src"], None))
+            if self._picture is not None:
+                self._picture.extend(candidates)
+            elif candidates:
+                self.images.append(candidates)
+        elif tag == "source" and self._picture is not None:
+            self._picture.extend(parse_srcset(attrs.get("srcset")))
+        elif tag == "picture":
+            self._close_picture()
+            self._picture = []
+        elif tag == "style":
+            self._in_style = True
+
+    def end(self, tag: str) -> None:
+        if tag == "picture":
+            self._close_picture()
+        elif tag == "style":
+            self._in_style = False
+
+    def data(self, text: str) -> None:
+        if self._in_style:
+            self._scan_css(text)
+
+    def result(self) -> Tuple[List[List[Tuple[str, Optional[float]]]], List[str]]:
+        self._close_picture()
+        return self.images, self.hrefs
+
+    def _close_picture(self) -> None:
+        if self._picture:
+            self.images.append(self._picture)
+        self._picture = None
+
+    def _scan_css(self, css: str) -> None:
+        for match in CSS_URL.finditer(css):
+            # url(#id) points at an SVG element on the page, not at an image
+            if not match.group(2).strip().startswith("#"):
+                self.images.append([(match.group(2), None)])
+
+
+class TagScanner(HTMLParser):
+    """Single-pass tokenizer feeding a PageScan without building a tree."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.scan = PageScan()
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.scan.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag: str) -> None:
+        self.scan.end(tag)
+
+    def handle_data(self, data: str) -> None:
+        self.scan.data(data)
+
+
+class LxmlTagScanner:
+    """lxml parser target feeding a PageScan without building a tree."""
+
+    def __init__(self) -> None:
+        self.scan = PageScan()
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        self.scan.start(tag, attrib)
+
+    def end(self, tag: str) -> None:
+        self.scan.end(tag)
+
+    def data(self, data: str) -> None:
+        self.scan.data(data)
+
+    def close(self) -> Tuple[List[List[Tuple[str, Optional[float]]]], List[str]]:
+        return self.scan.result()
+
+
+def decode_html(content: bytes) -> str:
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content.decode("latin-1")
+
+
+def scan_stream(content: bytes) -> Tuple[List[List[Tuple[str, Optional[float]]]], List[str]]:
+    scanner = TagScanner()
+    scanner.feed(decode_html(content))
+    scanner.close()
+    return scanner.scan.result()
+
+
+def scan_lxml(content: bytes) -> Tuple[List[List[Tuple[str, Optional[float]]]], List[str]]:
+    try:
+        from lxml import etree
+    except ImportError:
+        raise RuntimeError("the lxml parser requires lxml (pip install lxml)")
+    if not content.strip():
+        return [], []
+    return etree.fromstring(content, etree.HTMLParser(target=LxmlTagScanner()))
+
+
+def scan_bs4(content: bytes) -> Tuple[List[List[Tuple[str, Optional[float]]]], List[str]]:
+    from bs4 import BeautifulSoup, Tag
+
+    soup = BeautifulSoup(content, "html.parser")
+    scan = PageScan()
+    # Walk the tree iteratively, replaying it as start/end/data events
+    stack: list = list(reversed(soup.contents))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, tuple):
+            scan.end(node[0])
+        elif isinstance(node, Tag):
+            attrs = {
+                key: " ".join(value) if isinstance(value, list) else value
+                for key, value in node.attrs.items()
+            }
+            scan.start(node.name, attrs)
+            stack.append((node.name,))
+            stack.extend(reversed(node.contents))
+        else:
+            scan.data(str(node))
+    return scan.result()
+
+
+# Each parser returns the image candidate groups and raw a[href] values of a page
+PARSERS: Dict[
+    str, Callable[[bytes], Tuple[List[List[Tuple[str, Optional[float]]]], List[str]]]
+] = {
+    "stream": scan_stream,
+    "lxml": scan_lxml,
+    "bs4": scan_bs4,
+}
+
 
-    for img in tqdm(images, desc="Processing Img"):
-        src = img.get("src")
-        if not src:
+def image_extension(url: str) -> Optional[str]:
+    """Return the URL's image extension, "" if it has none, None if unsupported."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https"):
+        return None
+    ext = os.path.splitext(parsed.path)[-1].lower()
+    if ext in EXTENSIONS or ext == "":
+        return ext
+    return None
+
+
+def find_image_urls(
+    url: str, groups: List[List[Tuple[str, Optional[float]]]]
+) -> List[str]:
+    """Return the absolute URL of the best supported rendition of each image.
+
+    Extensionless URLs are kept; save_image() checks what they really are
+    from the first bytes it receives.
+    """
+    image_urls = []
+    page_url = urldefrag(url)[0]
+    for group in groups:
+        candidates = [
+            (full_url, size)
+            for full_url, size in ((urljoin(url, src.strip()), size) for src, size in group)
+            if image_extension(full_url) is not None and urldefrag(full_url)[0] != page_url
+        ]
+        if not candidates:
             continue
-        full_url = urljoin(url, src)
-        ext = os.path.splitext(full_url)[-1].lower()
-        if ext in EXTENSIONS:
-            if save_image(full_url, save_dir):
-                download_count += 1
+        sized = [candidate for candidate in candidates if candidate[1] is not None]
+        if sized:
+            image_urls.append(max(sized, key=lambda candidate: candidate[1])[0])
+        else:
+            image_urls.append(candidates[0][0])
+    return list(dict.fromkeys(image_urls))
+
+
+def extract_images(image_urls: List[str], ctx: CrawlContext) -> int:
+    """Download the images found on a page."""
+    download_count = 0
+
+    for image_url in image_urls:
+        if save_image(image_url, ctx):
+            download_count += 1
 
     return download_count
 
 
-def extract_links(url: str, soup: BeautifulSoup, visited: Set[str]) -> Set[str]:
-    """Extract unique links from a page."""
+def extract_links(url: str, hrefs: List[str]) -> Set[str]:
+    """Extract unique same-host links from a page."""
     links = set()
-    for a_tag in soup.find_all("a", href=True):
-        href = urljoin(url, a_tag["href"])
-        if href not in visited and urlparse(href).netloc == urlparse(url).netloc:
-            links.add(href)
+    host = urlparse(url).netloc
+    for href in hrefs:
+        full_url = urljoin(url, href)
+        if urlparse(full_url).netloc == host:
+            links.add(full_url)
     return links
 
 
-def scrape(
-    url: str, depth: int, save_dir: pathlib.Path, visited: Set[str], verbose: bool
+def parse_page(
+    url: str, content: bytes, parser: str = DEFAULT_PARSER
+) -> Tuple[List[str], Set[str]]:
+    """Return the image URLs and links found in a page."""
+    groups, hrefs = PARSERS[parser](content)
+    return find_image_urls(url, groups), extract_links(url, hrefs)
+
+
+def fetch_page(url: str, ctx: CrawlContext) -> Tuple[List[str], Set[str]]:
+    """Fetch and parse a page, replaying the journal if it was not modified."""
+    import requests
+
+    ctx.robots.wait(url)
+    headers = {"User-Agent": USER_AGENT, **ctx.journal.validators(url)}
+    with ctx.metrics.fetch(url, "page") as fetch:
+        response = requests.get(url, headers=headers, timeout=10)
+        fetch.status = response.status_code
+        fetch.size = len(response.content)
+        fetch.phases["ttfb"] = response.elapsed.total_seconds()
+    if response.status_code == 304:
+        return ctx.journal.cached_page(url)
+    response.raise_for_status()
+    with ctx.metrics.timer("parse"):
+        image_urls, links = parse_page(url, response.content, ctx.parser)
+    ctx.journal.record(url, response.headers, image_urls, links)
+    return image_urls, links
+
+
+def scrape(frontier: Frontier, ctx: CrawlContext, visited: Set[str]) -> None:
+    """Scrape a website for images breadth-first, one level at a time."""
+    from tqdm import tqdm
+
+    for level, urls in frontier.levels():
+        ctx.metrics.sample_queue(level, len(urls), 0)
+        for page_url in tqdm(urls, desc=f"Processing level {level}", disable=ctx.quiet):
+            if page_url in visited:
+                continue
+            visited.add(page_url)
+            try:
+                print(f"{Color.INFO}Scraping: {page_url}{Color.RESET}")
+                image_urls, links = fetch_page(page_url, ctx)
+                image_urls = [image for image in image_urls if image not in visited]
+                visited.update(image_urls)
+
+                download_count = extract_images(image_urls, ctx)
+                print(
+                    f"{Color.INFO}Downloaded {download_count} images from {page_url}{Color.RESET}"
+                )
+                frontier.discover(links, level)
+                frontier.mark_fetched(page_url, level)
+            except PermissionError as e:
+                print(f"{Color.ERROR}Error scraping {page_url}: {e}{Color.RESET}")
+                frontier.mark_skipped(page_url)
+            except Exception as e:
+                print(f"{Color.ERROR}Error scraping {page_url}: {e}{Color.RESET}")
+
+
+def fetch_page_limited(
+    url: str, ctx: CrawlContext, limiter: HostLimiter
+) -> Tuple[List[str], Set[str]]:
+    """Fetch a page while holding a slot for its host."""
+    print(f"{Color.INFO}Scraping: {url}{Color.RESET}")
+    with limiter.slot(url):
+        return fetch_page(url, ctx)
+
+
+def download_image(url: str, ctx: CrawlContext, limiter: HostLimiter) -> bool:
+    """Download an image while holding a slot for its host."""
+    with limiter.slot(url):
+        return save_image(url, ctx)
+
+
+def scrape_concurrent(
+    frontier: Frontier,
+    ctx: CrawlContext,
+    visited: VisitedSet,
+    workers: int,
+    per_host: int,
 ) -> None:
-    """Recursively scrape a website for images."""
-    if depth < 0 or url in visited:
-        return
-    visited.add(url)
+    """Scrape a website with a pool of workers sharing a single frontier."""
+    limiter = HostLimiter(per_host)
+    downloads = []
 
+    pool = ThreadPoolExecutor(max_workers=workers)
     try:
-        print(f"{Color.INFO}Scraping: {url}{Color.RESET}")
-        content = fetch_content(url)
-        soup = BeautifulSoup(content, "html.parser")
+        for level, urls in frontier.levels():
+            ctx.metrics.sample_queue(
+                level, len(urls), sum(not download.done() for download in downloads)
+            )
+            pages = {
+                pool.submit(fetch_page_limited, page_url, ctx, limiter): page_url
+                for page_url in urls
+                if visited.claim(page_url)
+            }
+            # Images start downloading while the rest of the level is fetched
+            for future in as_completed(pages):
+                page_url = pages[future]
+                try:
+                    image_urls, links = future.result()
+                except PermissionError as e:
+                    print(f"{Color.ERROR}Error scraping {page_url}: {e}{Color.RESET}")
+                    frontier.mark_skipped(page_url)
+                    continue
+                except Exception as e:
+                    print(f"{Color.ERROR}Error scraping {page_url}: {e}{Color.RESET}")
+                    continue
+                page_downloads = [
+                    pool.submit(download_image, image_url, ctx, limiter)
+                    for image_url in image_urls
+                    if visited.claim(image_url)
+                ]
+                downloads.extend(page_downloads)
+                if ctx.verbose:
+                    print(
+                        f"{Color.INFO}Queued {len(image_urls)} images and "
+                        f"{len(links)} links from {page_url}{Color.RESET}"
+                    )
+                frontier.discover(links, level)
+                frontier.mark_fetched(page_url, level, page_downloads)
+        wait(downloads)
+    except BaseException:
+        # Drop everything still queued instead of finishing it, so Ctrl-C is
+        # quick; unfinished pages are still pending in the journal
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
 
-        download_count = extract_images(url, soup, save_dir)
-        print(f"{Color.INFO}Downloaded {download_count} images from {url}{Color.RESET}")
+async def wait_for_robots(url: str, ctx: CrawlContext) -> None:
+    """Check robots.txt and sleep out the host's crawl delay without blocking."""
+    import asyncio
 
-        if depth > 0:
-            links = extract_links(url, soup, visited)
-            for link in tqdm(links, desc="Processing links"):
-                scrape(link, depth - 1, save_dir, visited, verbose)
+    await asyncio.sleep(await asyncio.to_thread(ctx.robots.reserve, url))
 
+
+async def fetch_page_async(
+    session, url: str, ctx: CrawlContext
+) -> Tuple[List[str], Set[str]]:
+    """Fetch and parse a page over a pooled aiohttp session."""
+    await wait_for_robots(url, ctx)
+    with ctx.metrics.fetch(url, "page") as fetch:
+        async with session.get(
+            url, headers=ctx.journal.validators(url), trace_request_ctx=fetch
+        ) as response:
+            fetch.status = response.status
+            if response.status == 304:
+                return ctx.journal.cached_page(url)
+            response.raise_for_status()
+            content = await response.read()
+            fetch.size = len(content)
+    with ctx.metrics.timer("parse"):
+        image_urls, links = parse_page(url, content, ctx.parser)
+    ctx.journal.record(url, response.headers, image_urls, links)
+    return image_urls, links
+
+
+async def save_image_async(session, url: str, ctx: CrawlContext) -> bool:
+    """Stream an image to disk on the event loop."""
+    validators = ctx.journal.validators(url) if ctx.store.holds(url) else {}
+    if ctx.store.holds(url) and not validators:
+        print(f"{Color.WARNING}Image already downloaded: {url}{Color.RESET}")
+        return False
+
+    try:
+        await wait_for_robots(url, ctx)
+        with ctx.metrics.fetch(url, "image") as fetch:
+            async with session.get(
+                url, headers=validators, trace_request_ctx=fetch
+            ) as response:
+                fetch.status = response.status
+                if response.status == 304:
+                    print(f"{Color.INFO}Image not modified: {url}{Color.RESET}")
+                    return False
+                response.raise_for_status()
+                with PartialImage(ctx.store, url, response.headers, ctx.hook) as image:
+                    try:
+                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                            image.write(chunk)
+                        saved = image.commit()
+                    finally:
+                        fetch.size = image.size
+                        fetch.phases["write"] = image.write_time
+            ctx.journal.record(url, response.headers)
+            return saved
+    except ImageTooLarge as e:
+        print(f"{Color.WARNING}Skipping large image ({e}): {url}{Color.RESET}")
+        return False
+    except NotAnImage as e:
+        print(f"{Color.WARNING}Skipping non-image ({e}): {url}{Color.RESET}")
+        return False
     except Exception as e:
-        print(f"{Color.ERROR}Error scraping {url}: {e}{Color.RESET}")
+        print(f"{Color.ERROR}Failed to download {url}: {e}{Color.RESET}")
+        return False
+
+
+def phase_trace_config(aiohttp):
+    """Build an aiohttp TraceConfig filling each FetchRecord's network phases."""
+    trace_config = aiohttp.TraceConfig()
+    started: Dict[Tuple[int, str], float] = {}
+
+    def start_of(phase: str):
+        async def handler(session, context, params) -> None:
+            started[(id(context), phase)] = time.perf_counter()
+
+        return handler
+
+    def end_of(phase: str):
+        async def handler(session, context, params) -> None:
+            fetch = context.trace_request_ctx
+            start = started.pop((id(context), phase), None)
+            if isinstance(fetch, FetchRecord) and start is not None:
+                fetch.phases[phase] = time.perf_counter() - start
+
+        return handler
+
+    async def headers_received(session, context, params) -> None:
+        fetch = context.trace_request_ctx
+        if isinstance(fetch, FetchRecord):
+            fetch.phases["ttfb"] = time.perf_counter() - fetch.start
+
+    trace_config.on_dns_resolvehost_start.append(start_of("dns"))
+    trace_config.on_dns_resolvehost_end.append(end_of("dns"))
+    trace_config.on_connection_create_start.append(start_of("connect"))
+    trace_config.on_connection_create_end.append(end_of("connect"))
+    trace_config.on_request_end.append(headers_received)
+    return trace_config
+
+
+async def scrape_async(
+    frontier: Frontier,
+    ctx: CrawlContext,
+    visited: VisitedSet,
+    workers: int,
+    per_host: int,
+) -> None:
+    """Scrape a website from a single event loop with keep-alive connections."""
+    import asyncio
+
+    try:
+        import aiohttp
+    except ImportError:
+        raise RuntimeError("the --async backend requires aiohttp (pip install aiohttp)")
+
+    # The connector keeps a pool of keep-alive connections per host, so pages
+    # and images on the same host reuse their TCP/TLS handshakes.
+    connector = aiohttp.TCPConnector(limit=workers, limit_per_host=per_host)
+    timeout = aiohttp.ClientTimeout(total=10)
+    headers = {"User-Agent": USER_AGENT}
+    downloads: Set[asyncio.Task] = set()
+
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        headers=headers,
+        trace_configs=[phase_trace_config(aiohttp)],
+    ) as session:
+
+        async def crawl_page(page_url: str, level: int) -> None:
+            try:
+                print(f"{Color.INFO}Scraping: {page_url}{Color.RESET}")
+                image_urls, links = await fetch_page_async(session, page_url, ctx)
+            except PermissionError as e:
+                print(f"{Color.ERROR}Error scraping {page_url}: {e}{Color.RESET}")
+                frontier.mark_skipped(page_url)
+                return
+            except Exception as e:
+                print(f"{Color.ERROR}Error scraping {page_url}: {e}{Color.RESET}")
+                return
+
+            page_downloads = [
+                asyncio.ensure_future(save_image_async(session, image_url, ctx))
+                for image_url in image_urls
+                if visited.claim(image_url)
+            ]
+            downloads.update(page_downloads)
+            if ctx.verbose:
+                print(
+                    f"{Color.INFO}Queued {len(image_urls)} images and "
+                    f"{len(links)} links from {page_url}{Color.RESET}"
+                )
+            frontier.discover(links, level)
+            frontier.mark_fetched(page_url, level, page_downloads)
+
+        for level, urls in frontier.levels():
+            ctx.metrics.sample_queue(
+                level, len(urls), sum(not download.done() for download in downloads)
+            )
+            await asyncio.gather(
+                *(crawl_page(page_url, level) for page_url in urls if visited.claim(page_url))
+            )
+        if downloads:
+            await asyncio.wait(downloads)
+
+
+def print_level_stats(frontier: Frontier) -> None:
+    """Show how many pages each crawl level contributed."""
+    for level, pages in sorted(frontier.pages_per_level.items()):
+        print(f"{Color.INFO}Level {level}: {pages} pages{Color.RESET}")
 
 
 def main():
-    print_header()
+    args = parse_arguments()
+    if not args.quiet:
+        print_header()
+    journal = None
+    metrics = None
+    hook = None
     try:
-        args = parse_arguments()
         args.URL = validate_url(args.URL)
-        check_robots_txt(args.URL)
+        robots = RobotsCache()
+        if not robots.allowed(args.URL):
+            raise PermissionError(f"Access to {args.URL} is disallowed by robots.txt")
         validate_save_path(args.path)
-        scrape(
-            url=args.URL,
-            depth=args.level if args.recursive else 0,
-            save_dir=args.path,
-            visited=set(),
-            verbose=args.verbose,
+        journal = CrawlJournal(args.path / STATE_FILE)
+        metrics = CrawlMetrics(args.metrics)
+        if args.hook:
+            hook = MetadataHook(args.hook, args.path, args.hook_workers, args.verbose)
+        ctx = CrawlContext(
+            ImageStore(args.path),
+            journal,
+            robots,
+            args.verbose,
+            args.parser,
+            metrics,
+            args.quiet,
+            hook,
+        )
+        frontier = Frontier(
+            args.URL, args.level if args.recursive else 0, journal, args.resume
         )
+        if args.resume:
+            print(
+                f"{Color.INFO}Resuming crawl with {frontier.pending()} pending pages{Color.RESET}"
+            )
+        if args.use_async:
+            import asyncio
+
+            asyncio.run(
+                scrape_async(
+                    frontier=frontier,
+                    ctx=ctx,
+                    visited=VisitedSet(),
+                    workers=(
+                        args.workers if args.workers > 1 else DEFAULT_ASYNC_WORKERS
+                    ),
+                    per_host=args.per_host,
+                )
+            )
+        elif args.workers > 1:
+            scrape_concurrent(
+                frontier=frontier,
+                ctx=ctx,
+                visited=VisitedSet(),
+                workers=args.workers,
+                per_host=args.per_host,
+            )
+        else:
+            scrape(frontier=frontier, ctx=ctx, visited=set())
+        print_level_stats(frontier)
     except KeyboardInterrupt:
         print(f"{Color.WARNING}\nInterrupted by user.{Color.RESET}")
     except Exception as e:
         print(f"{Color.ERROR}Error: {e}{Color.RESET}")
     finally:
+        if hook is not None:
+            hook.close()
+        if journal is not None:
+            journal.close()
+        if metrics is not None:
+            summary = metrics.close()
+            if args.metrics:
+                print_metrics(summary)
         print(f"{Color.SUCCESS}Total images downloaded: {total_downloads}{Color.RESET}")
 
 
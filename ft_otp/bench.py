@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Tuple
+
+from ft_otp import Color, OtpKey, digests, digit_counts, hotp, time_step, totp, verify_totp
+
+# RFC 4226 appendix D: HOTP-SHA1 with the ASCII secret "12345678901234567890"
+HOTP_VECTORS = [
+    "755224", "287082", "359152", "969429", "338314",
+    "254676", "287922", "162583", "399871", "520489",
+]
+# RFC 6238 appendix B: 8-digit TOTP, the seed repeated to the hash's block length
+TOTP_SEEDS = {
+    "sha1": b"12345678901234567890",
+    "sha256": b"12345678901234567890123456789012",
+    "sha512": b"1234567890123456789012345678901234567890123456789012345678901234",
+}
+TOTP_VECTORS = [
+    (59, {"sha1": "94287082", "sha256": "46119246", "sha512": "90693936"}),
+    (1111111109, {"sha1": "07081804", "sha256": "68084774", "sha512": "25091201"}),
+    (1111111111, {"sha1": "14050471", "sha256": "67062674", "sha512": "99943326"}),
+    (1234567890, {"sha1": "89005924", "sha256": "91819424", "sha512": "93441116"}),
+    (2000000000, {"sha1": "69279037", "sha256": "90698825", "sha512": "38618901"}),
+    (20000000000, {"sha1": "65353130", "sha256": "77737706", "sha512": "47863826"}),
+]
+SECRET_SIZES = {"sha1": 20, "sha256": 32, "sha512": 64}
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="ft_otp conformance and benchmarks")
+    parser.add_argument("--check-only", action="store_true", help="Only check the RFC vectors")
+    parser.add_argument("--keys", default=1000, type=int, help="Random secrets (default 1000)")
+    parser.add_argument("--ops", default=100000, type=int, help="Operations per mode (default 100000)")
+    parser.add_argument("--window", default=1, type=int, help="Verify drift window (default 1)")
+    parser.add_argument("--digest", choices=digests, default="sha1", help="HMAC hash (default sha1)")
+    parser.add_argument("--digits", type=int, choices=digit_counts, default=6, help="Code length")
+    parser.add_argument(
+        "--workers",
+        nargs="+",
+        default=[os.cpu_count() or 1],
+        type=int,
+        help="Process counts for the multi-process mode (default all cores)",
+    )
+    return parser.parse_args()
+
+
+def check_vectors() -> List[str]:
+    """Compare hotp/totp/verify_totp against the RFC test vectors, returning the failures."""
+    failures = []
+    for counter, expected in enumerate(HOTP_VECTORS):
+        got = hotp(TOTP_SEEDS["sha1"], counter)
+        if got != expected:
+            failures.append(f"HOTP counter {counter}: {got} != {expected}")
+    for timestamp, codes in TOTP_VECTORS:
+        for digest, expected in codes.items():
+            got = totp(TOTP_SEEDS[digest], timestamp, digest, 8)
+            if got != expected:
+                failures.append(f"TOTP {digest} at {timestamp}: {got} != {expected}")
+            drift = verify_totp(TOTP_SEEDS[digest], expected, timestamp + 30, 1, digest, 8)
+            if drift != -1:
+                failures.append(f"verify {digest} at {timestamp + 30}: drift {drift} != -1")
+    return failures
+
+
+def make_keys(args: argparse.Namespace) -> List[bytes]:
+    return [os.urandom(SECRET_SIZES[args.digest]) for _ in range(args.keys)]
+
+
+def per_second(work: Callable[[], int]) -> float:
+    start = time.perf_counter()
+    done = work()
+    return done / (time.perf_counter() - start)
+
+
+def single(secrets: List[bytes], args: argparse.Namespace) -> Tuple[float, float]:
+    """One library call per code, each keying a new HMAC."""
+    now = time.time()
+    codes = [(secret, totp(secret, now, args.digest, args.digits)) for secret in secrets]
+
+    def generate() -> int:
+        for i in range(args.ops):
+            totp(secrets[i % len(secrets)], now, args.digest, args.digits)
+        return args.ops
+
+    def verify() -> int:
+        for i in range(args.ops):
+            secret, code = codes[i % len(codes)]
+            verify_totp(secret, code, now, args.window, args.digest, args.digits)
+        return args.ops
+
+    return per_second(generate), per_second(verify)
+
+
+# Prepared keys and their current codes, set up once per process
+keys: List[OtpKey] = []
+codes: List[str] = []
+counter = 0
+
+
+def prepare(secrets: List[bytes], digest: str, digits: int) -> None:
+    global keys, codes, counter
+    keys = [OtpKey(secret, digest, digits) for secret in secrets]
+    counter = int(time.time() // time_step)
+    codes = [key.code(counter) for key in keys]
+
+
+def generate_batch(ops: int) -> int:
+    for i in range(ops):
+        keys[i % len(keys)].code(counter + i // len(keys))
+    return ops
+
+
+def verify_batch(ops: int, window: int) -> int:
+    for i in range(ops):
+        keys[i % len(keys)].verify(codes[i % len(keys)], counter, window)
+    return ops
+
+
+def batched(secrets: List[bytes], args: argparse.Namespace) -> Tuple[float, float]:
+    """Prepared OtpKeys reused across calls, like the server's key cache."""
+    prepare(secrets, args.digest, args.digits)
+    generate = per_second(lambda: generate_batch(args.ops))
+    verify = per_second(lambda: verify_batch(args.ops, args.window))
+    return generate, verify
+
+
+def multi_process(secrets: List[bytes], args: argparse.Namespace, workers: int) -> Tuple[float, float]:
+    """The batched mode split across processes; rates are for the whole pool."""
+    ops = args.ops // workers
+    with ProcessPoolExecutor(
+        workers, initializer=prepare, initargs=(secrets, args.digest, args.digits)
+    ) as pool:
+        # Start every worker before timing
+        list(pool.map(abs, range(workers)))
+        generate = per_second(lambda: sum(pool.map(generate_batch, [ops] * workers)))
+        verify = per_second(
+            lambda: sum(pool.map(verify_batch, [ops] * workers, [args.window] * workers))
+        )
+    return generate, verify
+
+
+def main() -> None:
+    args = parse_arguments()
+    failures = check_vectors()
+    for failure in failures:
+        print(f"{Color.ERROR}{failure}{Color.RESET}")
+    if failures:
+        sys.exit(1)
+    print(f"{Color.SUCCESS}RFC 4226/6238 vectors OK{Color.RESET}")
+    if args.check_only:
+        return
+
+    secrets = make_keys(args)
+    print(
+        f"{args.keys} keys, {args.digest}, {args.digits} digits, "
+        f"window {args.window}, {args.ops} ops per mode"
+    )
+    print(f"{'mode':14} {'codes/s':>10} {'verify/s':>10}")
+    generate, verify = single(secrets, args)
+    print(f"{'single':14} {generate:10.0f} {verify:10.0f}")
+    generate, verify = batched(secrets, args)
+    print(f"{'batched':14} {generate:10.0f} {verify:10.0f}")
+    for workers in args.workers:
+        generate, verify = multi_process(secrets, args, workers)
+        print(f"{f'{workers} processes':14} {generate:10.0f} {verify:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
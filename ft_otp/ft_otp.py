@@ -1,14 +1,25 @@
 #! /usr/bin/env python3
 
 import argparse
+import csv
+import io
+import json
 import os
+import signal
+import socket
+import socketserver
+import sqlite3
+import sys
+import tempfile
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
 
-import hashlib
 import base64
 import hmac
-from cryptography.fernet import Fernet
-import qrcode
+from cryptography.fernet import Fernet, MultiFernet
 
 # from PIL import Image
 
@@ -16,9 +27,23 @@ Args = argparse.Namespace
 Parser = argparse.ArgumentParser
 
 default_key_file = "ft_otp.key"
+default_store_file = "ft_otp.db"
+master_key_file = "master.key"
+pending_master_key_file = "master.key.new"  # Exists only while a rotation is in progress
 time_step = 30
 issuer = "ft_otp"
 email = "ft_otp@42.de"
+digests = ["sha1", "sha256", "sha512"]
+digit_counts = [6, 7, 8]
+default_digest = "sha1"
+default_digits = 6
+qr_formats = ["png", "svg"]
+default_qr_dir = "qrcodes"
+agent_socket_file = os.environ.get("FT_OTP_AGENT", "ft_otp.agent")
+agent_timeout = 1.0  # Seconds to wait for the agent before decrypting locally
+session_ttl = 900  # Seconds an unlocked agent keeps the master key and secrets
+cache_size = 1024  # Decrypted keys kept in memory by the server
+drift_window = 1  # Time steps accepted on each side of now when verifying
 
 
 class Color:
@@ -65,12 +90,127 @@ def parse_args() -> Args:
         metavar="KEY FILE",
         help="Generate a one time password that expires after 30 secs from a .key file",
     )
+    group.add_argument(
+        "-u",
+        "--user",
+        type=str,
+        metavar="USER",
+        help="Generate a one time password for USER from the key store",
+    )
+    group.add_argument(
+        "--import",
+        dest="import_keys",
+        nargs="+",
+        metavar="[USER=]HEX FILE",
+        help="Add 64 hex keys to the key store; USER defaults to the file name, "
+        "directories import every .hex file in them",
+    )
+    group.add_argument(
+        "--rotate",
+        nargs="*",
+        metavar="KEY FILE",
+        help="Re-encrypt the key store and the given .key files under a new master key",
+    )
+    group.add_argument(
+        "--provision",
+        type=str,
+        metavar="USERS FILE",
+        help="Add the users of a CSV or JSONL file (user[,key] columns) to the key store, "
+        "generating missing keys, and write a QR code per new user to --out",
+    )
+    group.add_argument(
+        "-s",
+        "--serve",
+        action="store_true",
+        help="Answer generate/verify requests on stdin/stdout, or on --socket",
+    )
+    group.add_argument(
+        "--agent",
+        action="store_true",
+        help=f"Unlock a session: serve on {agent_socket_file} (or --socket, $FT_OTP_AGENT) "
+        "so -k and -u reuse decrypted keys until --ttl runs out or --lock",
+    )
+    group.add_argument(
+        "--lock",
+        action="store_true",
+        help="Wipe the agent's keys and stop it",
+    )
     parser.add_argument(
         "-q",
         "--qrcode",
         action="store_true",
         help="Generates a QR code for the key, compatible with Google Authenticator",
     )
+    parser.add_argument(
+        "--digest",
+        choices=digests,
+        default=default_digest,
+        help=f"HMAC hash for the codes (default {default_digest})",
+    )
+    parser.add_argument(
+        "--digits",
+        type=int,
+        choices=digit_counts,
+        default=default_digits,
+        help=f"Code length (default {default_digits})",
+    )
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=default_store_file,
+        metavar="DB FILE",
+        help=f"Key store used by --user, --import, --provision, --rotate and --serve "
+        f"(default {default_store_file})",
+    )
+    parser.add_argument(
+        "--out",
+        type=str,
+        default=default_qr_dir,
+        metavar="DIR",
+        help=f"With --provision, directory for the QR codes (default {default_qr_dir})",
+    )
+    parser.add_argument(
+        "--rekey",
+        action="store_true",
+        help="With --provision, replace the keys of users already in the store",
+    )
+    parser.add_argument(
+        "--qr-format",
+        choices=qr_formats,
+        default=qr_formats[0],
+        help=f"With --provision, QR code image format (default {qr_formats[0]})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="With --provision, processes rendering QR codes (default one per core)",
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        metavar="PATH",
+        help="With --serve, listen on this Unix socket instead of stdin/stdout",
+    )
+    parser.add_argument(
+        "--ttl",
+        type=float,
+        metavar="SECONDS",
+        help=f"With --serve or --agent, stop and forget every key after SECONDS "
+        f"(--agent default {session_ttl})",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=drift_window,
+        help=f"With --serve, time steps of drift accepted when verifying (default {drift_window})",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=cache_size,
+        help=f"With --serve, decrypted keys kept in memory (default {cache_size})",
+    )
     group.required = True
     return parser.parse_args()
 
@@ -86,10 +226,12 @@ def validate(key: str) -> None:
         raise Exception(f"key must be 64 hexadecimal characters. {e}")
 
 
-def get_master_key(key_file="master.key"):
+def get_master_key(key_file=master_key_file, create=True):
     if os.path.exists(key_file):
         with open(key_file, "rb") as file:
             return file.read()
+    elif not create:
+        raise FileNotFoundError(f"no master key in {key_file}")
     else:
         master_key = Fernet.generate_key()
         with open(key_file, "wb") as file:
@@ -98,13 +240,253 @@ def get_master_key(key_file="master.key"):
         return master_key
 
 
+def load_fernet(create=True):
+    """The master key, plus the next one if a rotation was interrupted."""
+    keys = [Fernet(get_master_key(create=create))]
+    if os.path.exists(pending_master_key_file):
+        with open(pending_master_key_file, "rb") as file:
+            keys.insert(0, Fernet(file.read()))
+    return MultiFernet(keys)
+
+
+class KeyStore:
+    """Encrypted secrets in SQLite, one row per user.
+
+    Rows are only decrypted when looked up, so opening a store with millions
+    of users costs the same as opening an empty one.
+    """
+
+    def __init__(self, path, fernet):
+        self.fernet = fernet
+        self.path = os.path.realpath(path)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA mmap_size = 268435456")
+        self.db.execute("CREATE TABLE IF NOT EXISTS keys (user TEXT PRIMARY KEY, token BLOB NOT NULL)")
+        self.lock = threading.Lock()
+
+    def put_many(self, entries):
+        """Encrypt and store (user, hex key) pairs in one transaction."""
+        rows = []
+        for user, key in entries:
+            validate(key)
+            rows.append((user, self.fernet.encrypt(key.encode())))
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO keys VALUES (?, ?)", rows)
+        return len(rows)
+
+    def add_new(self, entries):
+        """Store (user, hex key) pairs in one transaction, never replacing a
+        user's key; returns the pairs that were added."""
+        added = []
+        with self.lock, self.db:
+            for user, key in entries:
+                validate(key)
+                token = self.fernet.encrypt(key.encode())
+                cursor = self.db.execute("INSERT OR IGNORE INTO keys VALUES (?, ?)", (user, token))
+                if cursor.rowcount:
+                    added.append((user, key))
+        return added
+
+    def existing(self, users):
+        """The users among users that already have a key."""
+        users = list(users)
+        found = set()
+        with self.lock:
+            for i in range(0, len(users), 500):
+                chunk = users[i : i + 500]
+                query = f"SELECT user FROM keys WHERE user IN ({', '.join('?' * len(chunk))})"
+                found.update(row[0] for row in self.db.execute(query, chunk))
+        return found
+
+    def token(self, user):
+        """The user's encrypted key, or None; it changes whenever the key does."""
+        with self.lock:
+            row = self.db.execute("SELECT token FROM keys WHERE user = ?", (user,)).fetchone()
+        return None if row is None else row[0]
+
+    def decrypt(self, token):
+        return bytes.fromhex(self.fernet.decrypt(token).decode())
+
+    def secret(self, user):
+        token = self.token(user)
+        if token is None:
+            raise KeyError(f"no key for user {user}")
+        return self.decrypt(token)
+
+    def rotate(self, fernet):
+        """Re-encrypt every row with fernet's primary key, in one transaction."""
+        with self.lock, self.db:
+            rows = self.db.execute("SELECT user, token FROM keys").fetchall()
+            self.db.executemany(
+                "UPDATE keys SET token = ? WHERE user = ?",
+                ((fernet.rotate(token), user) for user, token in rows),
+            )
+        return len(rows)
+
+    def close(self):
+        self.db.close()
+
+
+def read_hex_files(paths):
+    """Yield (user, hex key) for USER=FILE, FILE and directory arguments."""
+    for path in paths:
+        user, _, file_name = path.rpartition("=")
+        if os.path.isdir(file_name):
+            for name in sorted(os.listdir(file_name)):
+                if name.endswith(".hex"):
+                    with open(os.path.join(file_name, name), "r") as file:
+                        yield name[: -len(".hex")], file.read().strip()
+            continue
+        with open(file_name, "r") as file:
+            yield user or os.path.splitext(os.path.basename(file_name))[0], file.read().strip()
+
+
+def import_keys(store_path, paths):
+    try:
+        store = KeyStore(store_path, load_fernet())
+        count = store.put_many(read_hex_files(paths))
+        store.close()
+        print(f"{count} keys were saved in {store_path}")
+    except Exception as e:
+        print(f"{Color.ERROR}Error: {e}{Color.RESET}")
+
+
+def read_users(path):
+    """Yield (user, hex key or None) from a CSV file with a header, or a .jsonl file."""
+    with open(path, "r", newline="") as file:
+        if path.endswith((".jsonl", ".json")):
+            rows = (json.loads(line) for line in file if line.strip())
+        else:
+            rows = csv.DictReader(file)
+        for row in rows:
+            if not row.get("user"):
+                raise ValueError(f"{path}: row without a user: {row}")
+            yield row["user"], row.get("key") or None
+
+
+def otpauth_uri(secret, label, issuer=issuer, digest=default_digest, digits=default_digits):
+    base32_secret = base64.b32encode(secret).decode("utf-8")
+    uri = f"otpauth://totp/{quote(label, safe=':@')}?secret={base32_secret}&issuer={quote(issuer)}"
+    if digest != default_digest or digits != default_digits:
+        uri += f"&algorithm={digest.upper()}&digits={digits}"
+    return uri
+
+
+def render_qr_codes(entries, out_dir, image_format, digest, digits):
+    """Write one QR code per (user, hex key), reusing a single QRCode object.
+
+    The images hold the secret in clear, so they are created readable by the
+    owner only.
+    """
+    import qrcode
+    import qrcode.image.svg
+
+    factory = qrcode.image.svg.SvgPathImage if image_format == "svg" else None
+    qr = qrcode.QRCode()
+    for user, key in entries:
+        qr.clear()
+        qr.version = None  # Otherwise make(fit=True) never picks a smaller version again
+        qr.add_data(otpauth_uri(bytes.fromhex(key), f"{issuer}:{user}", issuer, digest, digits))
+        qr.make(fit=True)
+        img = qr.make_image(image_factory=factory)
+        name = quote(user, safe="@.+-_")
+        path = os.path.join(out_dir, f"{name}.{image_format}")
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as file:
+            img.save(file)
+    return len(entries)
+
+
+def provision(users_path, store_path, out_dir, image_format, workers, digest, digits, rekey=False):
+    """Store a key for every new user in users_path and render their QR codes in parallel.
+
+    Users already in the store keep their key, and get no QR code, unless rekey.
+    """
+    try:
+        # A user listed twice keeps the last row, so the store and the QR code agree
+        users = list(dict(read_users(users_path)).items())
+        store = KeyStore(store_path, load_fernet())
+        if rekey:
+            entries = [(user, key or os.urandom(32).hex()) for user, key in users]
+            store.put_many(entries)
+        else:
+            existing = store.existing(user for user, _ in users)
+            entries = store.add_new(
+                (user, key or os.urandom(32).hex()) for user, key in users if user not in existing
+            )
+        store.close()
+        print(f"{len(entries)} keys were saved in {store_path}")
+        skipped = len(users) - len(entries)
+        if skipped:
+            print(
+                f"{Color.WARNING}{skipped} users already had a key and were skipped "
+                f"(--rekey replaces them){Color.RESET}"
+            )
+        if not entries:
+            return
+
+        os.makedirs(out_dir, exist_ok=True)
+        workers = max(1, min(workers or 1, len(entries)))
+        # A few chunks per worker keeps them busy without one QRCode per user
+        size = max(1, -(-len(entries) // (workers * 4)))
+        chunks = [entries[i : i + size] for i in range(0, len(entries), size)]
+        rendered = 0
+        if workers == 1:
+            for chunk in chunks:
+                rendered += render_qr_codes(chunk, out_dir, image_format, digest, digits)
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                jobs = [
+                    pool.submit(render_qr_codes, chunk, out_dir, image_format, digest, digits)
+                    for chunk in chunks
+                ]
+                rendered = sum(job.result() for job in jobs)
+        print(f"{rendered} QR codes were saved in {out_dir}")
+    except Exception as e:
+        print(f"{Color.ERROR}Error: {e}{Color.RESET}")
+
+
+def write_atomically(path, data):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def rotate_master_key(store_path, key_files):
+    """Move the store and key files to a new master key.
+
+    The new key is saved next to the old one first, and only replaces it once
+    everything was re-encrypted, so an interrupted rotation can be re-run.
+    """
+    try:
+        if not os.path.exists(pending_master_key_file):
+            write_atomically(pending_master_key_file, Fernet.generate_key())
+        fernet = load_fernet()
+        rotated = 0
+        if os.path.exists(store_path):
+            store = KeyStore(store_path, fernet)
+            rotated += store.rotate(fernet)
+            store.close()
+        for key_file in key_files:
+            with open(key_file, "r") as file:
+                token = base64.b32decode(file.read())
+            write_atomically(key_file, base64.b32encode(fernet.rotate(token)))
+            rotated += 1
+        os.replace(pending_master_key_file, master_key_file)
+        print(f"{rotated} keys were re-encrypted, new master key saved in {master_key_file}")
+    except Exception as e:
+        print(f"{Color.ERROR}Error: {e}{Color.RESET}")
+
+
 def generate_secret_key(key_file):
     try:
         with open(key_file, "r") as file:
             content = file.read().strip()
         validate(content)
-        seed = get_master_key()
-        fernet = Fernet(seed)
+        fernet = load_fernet()
         encrypted_key = fernet.encrypt(content.encode())
         encoded = base64.b32encode(encrypted_key).decode()
         with open(default_key_file, "w") as file:
@@ -114,49 +496,359 @@ def generate_secret_key(key_file):
         print(f"{Color.ERROR}Error: {e}{Color.RESET}")
 
 
-def generate_otp(key_file):
+def decrypt_secret(key_file, fernet):
+    with open(key_file, "r") as file:
+        secret = file.read()
+    secret_decoded = base64.b32decode(secret)
+    secret_decrypted = fernet.decrypt(secret_decoded).decode()
+    return bytes.fromhex(secret_decrypted)
+
+
+def truncate(mac, digits):
+    """Dynamic truncation of an HMAC into a code of digits digits."""
+    offset = mac[-1] & 0xF
+    chosen_bytes = mac[offset : offset + 4]
+    new_bin_value = (
+        ((chosen_bytes[0] & 0x7F) << 24)
+        + ((chosen_bytes[1] & 0xFF) << 16)
+        + ((chosen_bytes[2] & 0xFF) << 8)
+        + ((chosen_bytes[3] & 0xFF))
+    )
+    token = new_bin_value % 10**digits
+    return f"{token:0>{digits}}"
+
+
+class OtpKey:
+    """Codes for one secret, with the keyed HMAC state set up once.
+
+    hmac.new() hashes the padded key into its inner and outer states every
+    time; copying a prepared object skips that work for each counter.
+    """
+
+    def __init__(self, secret, digest=default_digest, digits=default_digits):
+        self.hmac = hmac.new(secret, digestmod=digest)
+        self.digits = digits
+
+    def code(self, counter):
+        mac = self.hmac.copy()
+        mac.update(counter.to_bytes(8, "big"))
+        return truncate(mac.digest(), self.digits)
+
+    def verify(self, code, counter, window):
+        """Check code against counter +/- window, returning the matching offset or None.
+
+        The whole window is always computed and compared, nearest first, so the
+        time taken does not tell which step matched.
+        """
+        match = None
+        for drift in sorted(range(-window, window + 1), key=abs):
+            if hmac.compare_digest(self.code(counter + drift), code) and match is None:
+                match = drift
+        return match
+
+
+def hotp(secret, counter, digest=default_digest, digits=default_digits):
+    """RFC 4226 code for counter."""
+    return OtpKey(secret, digest, digits).code(counter)
+
+
+def totp(secret, timestamp, digest=default_digest, digits=default_digits, step=time_step):
+    """RFC 6238 code for the step containing timestamp (seconds since the epoch)."""
+    return hotp(secret, int(timestamp // step), digest, digits)
+
+
+def verify_totp(
+    secret,
+    code,
+    timestamp,
+    window=drift_window,
+    digest=default_digest,
+    digits=default_digits,
+    step=time_step,
+):
+    """Step offset at which code is valid around timestamp, or None."""
+    return OtpKey(secret, digest, digits).verify(code, int(timestamp // step), window)
+
+
+def print_otp(secret, digest, digits):
+    print(f"OPT: [{totp(secret, time.time(), digest, digits)}]")
+
+
+def agent_request(line, socket_path=agent_socket_file):
+    """Send one protocol line to a running agent; None if none answers in time."""
     try:
-        with open(key_file, "r") as file:
-            secret = file.read()
-        seed = get_master_key()
-        fernet = Fernet(seed)
-        secret_decoded = base64.b32decode(secret)
-        secret_decrypted = fernet.decrypt(secret_decoded).decode()
-        secret = bytes.fromhex(secret_decrypted)
-
-        timestamp = time.time()
-        N = int(timestamp // time_step)
-        time_key = N.to_bytes(8, "big")
-
-        hmac_sha1 = hmac.new(secret, time_key, hashlib.sha1)
-        hmac_sha1_bytes = hmac_sha1.digest()
-        offset = hmac_sha1_bytes[-1] & 0xF
-        chosen_bytes = hmac_sha1_bytes[offset : offset + 4]
-        new_bin_value = (
-            ((chosen_bytes[0] & 0x7F) << 24)
-            + ((chosen_bytes[1] & 0xFF) << 16)
-            + ((chosen_bytes[2] & 0xFF) << 8)
-            + ((chosen_bytes[3] & 0xFF))
-        )
-        token = new_bin_value % 10**6
-        token = f"{token:0>6}"
-        print(f"OPT: [{token}]")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(agent_timeout)
+            sock.connect(socket_path)
+            sock.sendall(line.encode() + b"\n")
+            with sock.makefile("r") as reply:
+                return reply.readline().strip()
+    except OSError:  # No socket, nobody listening, or a wedged agent (socket.timeout)
+        return None
+
+
+def agent_otp(name, digest, digits, store_path=None):
+    """Code from the agent, or None to fall back to decrypting locally.
+
+    With store_path, the agent only answers if it serves that key store.
+    """
+    line = f"gen {name} {time.time()} {digest} {digits}"
+    if store_path is not None:
+        line += f" {os.path.realpath(store_path)}"
+    reply = agent_request(line)
+    if reply is None or not reply.startswith("OK "):
+        return None
+    return reply[len("OK ") :]
+
+
+def generate_otp(key_file, digest=default_digest, digits=default_digits):
+    try:
+        code = agent_otp(os.path.abspath(key_file), digest, digits)
+        if code is not None:
+            print(f"OPT: [{code}]")
+            return
+        print_otp(decrypt_secret(key_file, load_fernet()), digest, digits)
     except Exception as e:
         print(f"Error: {e}")
 
 
-def generate_qr_code(key_file, label=f"totp:{email}", issuer=f"{issuer}"):
+def generate_user_otp(store_path, user, digest=default_digest, digits=default_digits):
     try:
-        with open(key_file, "r") as file:
-            secret = file.read()
-        seed = get_master_key()
-        fernet = Fernet(seed)
-        secret_decoded = base64.b32decode(secret)
-        secret_decrypted = fernet.decrypt(secret_decoded).decode()
-        secret_bytes = bytes.fromhex(secret_decrypted)
-        base32_secret = base64.b32encode(secret_bytes).decode("utf-8")
-
-        uri = f"otpauth://totp/{label}?secret={base32_secret}&issuer={issuer}"
+        code = agent_otp(user, digest, digits, store_path)
+        if code is not None:
+            print(f"OPT: [{code}]")
+            return
+        if not os.path.exists(store_path):
+            raise FileNotFoundError(f"no key store at {store_path}")
+        store = KeyStore(store_path, load_fernet())
+        print_otp(store.secret(user), digest, digits)
+        store.close()
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+class KeyCache:
+    """Ready OtpKeys by name; the least recently used is evicted first.
+
+    A name is looked up as a user in the key store, then as a key file.
+    Every hit is checked against the user's current token or the file's
+    inode, size and mtime, so a re-keyed name is decrypted again.
+    Keys for another digest or length than the cache's are cached separately.
+    Once locked, the cache is emptied and refuses every lookup.
+    """
+
+    def __init__(self, fernet, store, size, digest=default_digest, digits=default_digits):
+        self.fernet = fernet
+        self.store = store
+        self.size = size
+        self.digest = digest
+        self.digits = digits
+        self.keys = OrderedDict()
+        self.lock = threading.Lock()
+        self.locked = False
+
+    def version(self, name, store_only=False):
+        """What name's key is now: the store token, or the key file's stat."""
+        if self.store is not None:
+            token = self.store.token(name)
+            if token is not None:
+                return token
+        if store_only:
+            raise KeyError(f"no key for user {name}")
+        try:
+            stats = os.stat(name)
+        except OSError:
+            raise KeyError(f"unknown key {name}")
+        return (stats.st_ino, stats.st_size, stats.st_mtime_ns)
+
+    def load(self, name, version):
+        if isinstance(version, bytes):
+            return self.store.decrypt(version)
+        return decrypt_secret(name, self.fernet)
+
+    def get(self, name, digest=None, digits=None, store_only=False):
+        entry = (
+            name,
+            self.digest if digest is None else digest,
+            self.digits if digits is None else digits,
+        )
+        with self.lock:
+            if self.locked:
+                raise KeyError("session is locked")
+        version = self.version(name, store_only)
+        with self.lock:
+            cached = self.keys.get(entry)
+            if cached is not None and cached[0] == version:
+                self.keys.move_to_end(entry)
+                return cached[1]
+        # A file rewritten between stat and read is caught by the next lookup
+        key = OtpKey(self.load(name, version), *entry[1:])
+        with self.lock:
+            if not self.locked:
+                self.keys[entry] = (version, key)
+                self.keys.move_to_end(entry)
+            while len(self.keys) > self.size:
+                self.keys.popitem(last=False)
+        return key
+
+    def close(self):
+        with self.lock:
+            self.locked = True
+            self.keys.clear()
+            self.fernet = None
+
+
+def handle_request(line, cache, window):
+    """Answer one protocol line.
+
+    gen KEY [UNIX_TIME [DIGEST DIGITS [STORE]]]  -> OK CODE
+    verify KEY CODE [UNIX_TIME]          -> OK STEP_OFFSET | FAIL
+    lock                                 -> OK, then every request fails
+    Anything that goes wrong             -> ERR message
+
+    KEY is a user in the key store or a .key file. With STORE, KEY must be a
+    user and STORE must be the served key store, so clients asking about
+    another store fall back to it themselves.
+    """
+    try:
+        command, *params = line.split()
+        if command == "gen" and len(params) in (1, 2, 4, 5):
+            timestamp = float(params[1]) if len(params) >= 2 else time.time()
+            counter = int(timestamp // time_step)
+            if len(params) >= 4:
+                if params[2] not in digests:
+                    raise ValueError(f"unknown digest {params[2]}")
+                if int(params[3]) not in digit_counts:
+                    raise ValueError(f"digits must be one of {digit_counts}")
+                store_only = len(params) == 5
+                if store_only and (cache.store is None or cache.store.path != params[4]):
+                    raise ValueError(f"not serving the key store {params[4]}")
+                key = cache.get(params[0], params[2], int(params[3]), store_only)
+            else:
+                key = cache.get(params[0])
+            return f"OK {key.code(counter)}"
+        if command == "verify" and len(params) in (2, 3):
+            timestamp = float(params[2]) if len(params) == 3 else time.time()
+            counter = int(timestamp // time_step)
+            drift = cache.get(params[0]).verify(params[1], counter, window)
+            return "FAIL" if drift is None else f"OK {drift}"
+        if command == "lock" and not params:
+            cache.close()
+            return "OK"
+        return "ERR usage: gen KEY [TIME [DIGEST DIGITS [STORE]]] | verify KEY CODE [TIME] | lock"
+    except KeyError as e:
+        return f"ERR {e.args[0]}"
+    except Exception as e:
+        return f"ERR {e}"
+
+
+def serve_stream(cache, window, instream, outstream):
+    """Answer lines until instream ends or the cache is locked."""
+    for line in instream:
+        if cache.locked:
+            break
+        if line.strip():
+            outstream.write(handle_request(line, cache, window) + "\n")
+            outstream.flush()
+        if cache.locked:
+            break
+
+
+def serve(
+    socket_path, store_path, window, size, digest=default_digest, digits=default_digits, ttl=None
+):
+    """Decrypt each key once and answer requests until stdin closes, Ctrl-C,
+    a lock request or ttl seconds have passed."""
+    try:
+        # Replies own stdout, and a new master key could not decrypt anything anyway
+        fernet = load_fernet(create=False)
+    except FileNotFoundError as e:
+        print(f"{Color.ERROR}Error: {e}{Color.RESET}", file=sys.stderr)
+        sys.exit(1)
+    store = KeyStore(store_path, fernet) if os.path.exists(store_path) else None
+    cache = KeyCache(fernet, store, size, digest, digits)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    if socket_path is None:
+
+        def expire():
+            cache.close()
+            # Interrupts the read stdin is blocked on
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        if ttl is not None:
+            timer = threading.Timer(ttl, expire)
+            timer.daemon = True
+            timer.start()
+        try:
+            serve_stream(cache, window, sys.stdin, sys.stdout)
+        finally:
+            cache.close()
+        return
+
+    def lock(server):
+        cache.close()
+        if store is not None:
+            store.close()
+        # shutdown() waits for serve_forever(), so it cannot run on a handler thread
+        threading.Thread(target=server.shutdown).start()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            instream = io.TextIOWrapper(self.rfile)
+            outstream = io.TextIOWrapper(self.wfile, write_through=True)
+            serve_stream(cache, window, instream, outstream)
+            if cache.locked:
+                lock(self.server)
+
+    if os.path.exists(socket_path):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.settimeout(agent_timeout)
+                probe.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)  # Left behind by a server that is gone
+        else:
+            print(f"{Color.ERROR}Error: {socket_path} is in use{Color.RESET}", file=sys.stderr)
+            sys.exit(1)
+    # Bind under a 0177 umask so the socket is never reachable by other users
+    umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+    finally:
+        os.umask(umask)
+    with server:
+        print(f"{Color.INFO}Listening on {socket_path}{Color.RESET}", file=sys.stderr)
+        if ttl is not None:
+            timer = threading.Timer(ttl, lock, (server,))
+            timer.daemon = True
+            timer.start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+def lock_agent(socket_path):
+    reply = agent_request("lock", socket_path)
+    if reply is None:
+        print(f"{Color.WARNING}No agent is running on {socket_path}{Color.RESET}")
+    elif reply == "OK":
+        print(f"{Color.SUCCESS}Agent locked{Color.RESET}")
+    else:
+        print(f"{Color.ERROR}Error: {reply}{Color.RESET}")
+
+
+def generate_qr_code(
+    secret, label=f"totp:{email}", issuer=f"{issuer}", digest=default_digest, digits=default_digits
+):
+    try:
+        uri = otpauth_uri(secret, label, issuer, digest, digits)
+        import qrcode
+
         qr = qrcode.QRCode()
         qr.add_data(uri)
         qr.make(fit=True)
@@ -173,9 +865,37 @@ def main():
         if args.generate is not None:
             generate_secret_key(args.generate)
         if args.key is not None:
-            generate_otp(args.key)
             if args.qrcode:
-                generate_qr_code(args.key)
+                # The QR code needs the secret itself, so unwrap it once for both
+                secret = decrypt_secret(args.key, load_fernet())
+                print_otp(secret, args.digest, args.digits)
+                generate_qr_code(secret, digest=args.digest, digits=args.digits)
+            else:
+                generate_otp(args.key, args.digest, args.digits)
+        if args.user is not None:
+            generate_user_otp(args.store, args.user, args.digest, args.digits)
+        if args.import_keys is not None:
+            import_keys(args.store, args.import_keys)
+        if args.provision is not None:
+            provision(
+                args.provision, args.store, args.out, args.qr_format, args.workers,
+                args.digest, args.digits, args.rekey,
+            )
+        if args.rotate is not None:
+            key_files = args.rotate or [f for f in [default_key_file] if os.path.exists(f)]
+            rotate_master_key(args.store, key_files)
+        if args.serve:
+            serve(
+                args.socket, args.store, args.window, args.cache_size,
+                args.digest, args.digits, args.ttl,
+            )
+        if args.agent:
+            serve(
+                args.socket or agent_socket_file, args.store, args.window, args.cache_size,
+                args.digest, args.digits, args.ttl or session_ttl,
+            )
+        if args.lock:
+            lock_agent(args.socket or agent_socket_file)
     except Exception as e:
         print(f"{Color.ERROR}Error: {e}")
 